@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Ghumfir.settings')
+# Async page views and no sync-only middleware; see SERVER_MODE in settings.
+# Serve with e.g. `uvicorn Ghumfir.asgi:application --workers 4`; the workers
+# need a shared CACHE_URL (a file cache by default in this mode).
+os.environ.setdefault('SERVER_MODE', 'asgi')
 
 application = get_asgi_application()
+
+from main.asgi import StaticFilesApp  # noqa: E402  (needs the app registry)
+
+application = StaticFilesApp(application)
@@ -33,3 +33,8 @@ admin.site.register(MemoryMedia)
 admin.site.register(GuideProfile)
 admin.site.register(Place)
 admin.site.register(PlaceUpdate)
+admin.site.register(OutboxEmail)
+admin.site.register(SOSUpload)
+admin.site.register(Language)
+admin.site.register(GuideReview)
+admin.site.register(PointsEvent)
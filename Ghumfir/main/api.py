@@ -0,0 +1,193 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from .db_router import read_only_view
+from .models import GuideProfile, Place
+from .memories import memory_page
+from .pagination import decode_cursor, encode_cursor, get_page_size
+from .search import search_places
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+PLACE_FIELDS = [
+    'id', 'name', 'region', 'destination_type', 'popularity', 'best_season', 'duration_days',
+    'altitude_m', 'latitude', 'longitude', 'starting_point', 'route_overview', 'ending_point',
+    'difficulty', 'permit_required', 'transportation_access', 'lodges_hotels', 'food_availability',
+    'emergency_facilities', 'local_community', 'cultural_attractions', 'language_customs',
+    'unique_traditions', 'adventure_type', 'not_to_miss_spots', 'wildlife_highlights',
+    'photography_hotspots',
+]
+PLACE_LIST_FIELDS = ['id', 'name', 'region', 'destination_type', 'difficulty', 'latitude', 'longitude']
+
+
+def _file_url(request, file):
+    return request.build_absolute_uri(file.url) if file else None
+
+
+# field -> how to read it off a GuideProfile with its user and languages loaded
+GUIDE_FIELDS = {
+    'id': lambda request, guide: guide.id,
+    'name': lambda request, guide: f"{guide.user.first_name} {guide.user.last_name}".strip(),
+    'profile_picture': lambda request, guide: _file_url(request, guide.user.profile_picture),
+    'primary_location': lambda request, guide: guide.primary_location,
+    'secondary_location': lambda request, guide: guide.secondary_location,
+    'experience': lambda request, guide: guide.experience,
+    'languages': lambda request, guide: [language.name for language in guide.spoken_languages.all()],
+    'specialization': lambda request, guide: guide.specialization,
+    'description': lambda request, guide: guide.description,
+    'rating': lambda request, guide: float(guide.rating),
+    'rating_count': lambda request, guide: guide.rating_count,
+    'rate_per_hour': lambda request, guide: float(guide.rate_per_hour),
+    'licensed': lambda request, guide: guide.Licenced,
+    'verified': lambda request, guide: guide.is_verified,
+    'trip_completed': lambda request, guide: guide.trip_completed,
+}
+GUIDE_LIST_FIELDS = ['id', 'name', 'profile_picture', 'primary_location', 'languages', 'rating', 'rate_per_hour']
+
+
+def _media(request, media):
+    return {
+        'type': media.media_type,
+        'url': _file_url(request, media.file),
+        'thumbnail': _file_url(request, media.thumbnail),
+        'display': _file_url(request, media.display),
+    }
+
+
+MEMORY_FIELDS = {
+    'id': lambda request, memory: memory.id,
+    'location_name': lambda request, memory: memory.location_name,
+    'created_at': lambda request, memory: memory.created_at,
+    'user': lambda request, memory: f"{memory.user.first_name} {memory.user.last_name}".strip(),
+    'media': lambda request, memory: [_media(request, media) for media in memory.media.all()],
+}
+
+
+class FieldError(ValueError):
+    pass
+
+
+def requested_fields(request, available, default):
+    """Parse ?fields=a,b,c against the fields an endpoint can return."""
+    raw = request.GET.get('fields', '').strip()
+    if not raw:
+        return list(default)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise FieldError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    return fields
+
+
+def _error(message, status=400):
+    return JsonResponse({"status": "error", "message": message}, status=status)
+
+
+def _serialize(request, obj, spec, fields):
+    return {field: spec[field](request, obj) for field in fields}
+
+
+def _after_id(request):
+    after = decode_cursor(request.GET.get('cursor'), [int])
+    return after[0] if after else None
+
+
+def _id_page(request, queryset):
+    """Slice a queryset ordered by id into a page; one query."""
+    page_size = get_page_size(request, API_PAGE_SIZE, API_MAX_PAGE_SIZE)
+    after = _after_id(request)
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    rows = list(queryset.order_by('id')[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([last['id'] if isinstance(last, dict) else last.id])
+    return rows, next_cursor
+
+
+@require_GET
+@gzip_page
+@read_only_view
+def place_list(request):
+    try:
+        fields = requested_fields(request, PLACE_FIELDS, PLACE_LIST_FIELDS)
+    except FieldError as e:
+        return _error(str(e))
+    keywords = [request.GET.get('q', '').strip()]
+    places = search_places(keywords).values(*set(fields) | {'id'})
+    rows, next_cursor = _id_page(request, places)
+    return JsonResponse({
+        'results': [{field: row[field] for field in fields} for row in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+@require_GET
+@gzip_page
+@read_only_view
+def place_item(request, pk):
+    try:
+        fields = requested_fields(request, PLACE_FIELDS, PLACE_FIELDS)
+    except FieldError as e:
+        return _error(str(e))
+    return JsonResponse(get_object_or_404(Place.objects.values(*fields), pk=pk))
+
+
+def _guide_queryset(fields):
+    guides = GuideProfile.objects.select_related('user')
+    if 'languages' in fields:
+        guides = guides.prefetch_related('spoken_languages')
+    return guides
+
+
+@require_GET
+@gzip_page
+@read_only_view
+def guide_list(request):
+    try:
+        fields = requested_fields(request, GUIDE_FIELDS, GUIDE_LIST_FIELDS)
+    except FieldError as e:
+        return _error(str(e))
+    guides = _guide_queryset(fields)
+    location = request.GET.get('location', '').strip()
+    if location:
+        guides = guides.filter(primary_location__icontains=location)
+    rows, next_cursor = _id_page(request, guides)
+    return JsonResponse({
+        'results': [_serialize(request, guide, GUIDE_FIELDS, fields) for guide in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+@require_GET
+@gzip_page
+@read_only_view
+def guide_item(request, pk):
+    try:
+        fields = requested_fields(request, GUIDE_FIELDS, GUIDE_FIELDS)
+    except FieldError as e:
+        return _error(str(e))
+    guide = get_object_or_404(_guide_queryset(fields), pk=pk)
+    return JsonResponse(_serialize(request, guide, GUIDE_FIELDS, fields))
+
+
+@require_GET
+@gzip_page
+@read_only_view
+def memory_list(request):
+    try:
+        fields = requested_fields(request, MEMORY_FIELDS, MEMORY_FIELDS)
+    except FieldError as e:
+        return _error(str(e))
+    page_size = get_page_size(request, API_PAGE_SIZE, API_MAX_PAGE_SIZE)
+    # Same feed as the capsule page: newest first, memories with media only
+    memories, next_cursor = memory_page(request.GET.get('q', '').strip(), request.GET.get('cursor'), page_size)
+    return JsonResponse({
+        'results': [_serialize(request, memory, MEMORY_FIELDS, fields) for memory in memories],
+        'next_cursor': next_cursor,
+    })
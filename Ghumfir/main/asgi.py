@@ -0,0 +1,56 @@
+from asgiref.sync import sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+READ_SIZE = 64 * 1024
+
+
+class StaticFilesApp:
+    """
+    ASGI app answering STATIC_URL requests the way WhiteNoiseMiddleware does
+    under WSGI (same files, precompressed variants and immutable headers) and
+    passing everything else to Django. Reading a file happens on the thread
+    pool so the event loop keeps serving other requests.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.whitenoise = WhiteNoiseMiddleware(get_response=None)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            static_file = self._find(scope['path'])
+            if static_file is not None:
+                await self._serve(static_file, scope, send)
+                return
+        await self.application(scope, receive, send)
+
+    def _find(self, path):
+        if self.whitenoise.autorefresh:
+            return self.whitenoise.find_file(path)
+        return self.whitenoise.files.get(path)
+
+    async def _serve(self, static_file, scope, send):
+        # WhiteNoise expects WSGI-style HTTP_* request headers
+        request_headers = {
+            'HTTP_' + name.decode('latin1').upper().replace('-', '_'): value.decode('latin1')
+            for name, value in scope['headers']
+        }
+        response = static_file.get_response(scope['method'], request_headers)
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.status),
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in response.headers],
+        })
+        if response.file is None:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        read = sync_to_async(response.file.read, thread_sensitive=False)
+        try:
+            while True:
+                chunk = await read(READ_SIZE)
+                more = len(chunk) == READ_SIZE
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more})
+                if not more:
+                    break
+        finally:
+            response.file.close()
@@ -0,0 +1,122 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404, render
+from django.views.decorators.csrf import csrf_exempt
+
+from .db_router import read_only_view
+from .guides import parse_guide_filters, search_guides
+from .memories import amemory_page, capsule_queryset, serialize_memory
+from .models import Place
+from .nearby import NEARBY_LIMIT, NEARBY_RADIUS_KM, nearby_places
+from .page_cache import cached_page
+from .search import search_places_page
+from .similar import similar_places
+from .sos import alert_contacts, save_video
+from .suggestions import suggest
+from .views import _place_keywords
+
+# Async versions of the read-heavy pages and the one-shot SOS upload, routed
+# instead of their main.views twins when SERVER_MODE is 'asgi' (see
+# Ghumfir/asgi.py). Model lookups go through the async ORM; the FTS5 and
+# numpy-backed helpers and template rendering (the nav bar reads the lazy
+# request.user) run through sync_to_async.
+arender = sync_to_async(render)
+
+
+@read_only_view
+@cached_page('place')
+async def places_listing(request):
+    keywords = _place_keywords(request)
+    places, next_cursor = await sync_to_async(search_places_page)(keywords)
+
+    suggestion = None
+    query = ' '.join(k for k in keywords if k)
+    if query and not places:
+        suggestion = await sync_to_async(suggest)('place', query)
+
+    context = {'places': places, 'next_cursor': next_cursor, "suggestion": suggestion, "top_header": True}
+    return await arender(request, 'main/place_listing.html', context)
+
+
+@read_only_view
+@cached_page('place')
+async def place_detail(request, pk):
+    place = await aget_object_or_404(Place, pk=pk)
+
+    nearby = []
+    if place.latitude is not None and place.longitude is not None:
+        nearby = await sync_to_async(nearby_places)(place.latitude, place.longitude, radius_km=NEARBY_RADIUS_KM,
+                                                    k=NEARBY_LIMIT, exclude=place.pk)
+
+    similar = [similar_place async for similar_place in similar_places(place.pk)]
+    context = {'place': place, 'nearby_places': nearby, 'similar_places': similar}
+    return await arender(request, 'main/place_detail.html', context)
+
+
+@read_only_view
+@cached_page('guide')
+async def guideListing(request):
+    filters = parse_guide_filters(request.GET)
+    guides, next_cursor, guide_count, facets = await sync_to_async(search_guides)(filters, request.GET.get('cursor'))
+
+    suggestion = None
+    if filters['q'] and guide_count == 0:
+        suggestion = await sync_to_async(suggest)('guide', filters['q'])
+
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+
+    context = {"guides": guides, 'display_footer': True, 'guide_count': guide_count, "search_query": filters['q'],
+               "suggestion": suggestion, "facets": facets, "next_query": next_query, "top_header": True}
+    return await arender(request, "main/guide_listing.html", context)
+
+
+@read_only_view
+async def memoryCapsule(request):
+    q = request.GET.get('q', '').strip()
+
+    memories, next_cursor = await amemory_page(q)
+    memory_data = [serialize_memory(memory) for memory in memories]
+
+    memory_count = len(memory_data)
+    if next_cursor:
+        memory_count = await capsule_queryset(q).acount()
+    suggestion = None
+    if q and memory_count == 0:
+        suggestion = await sync_to_async(suggest)('memory', q)
+
+    context = {
+        "memory_data": memory_data,
+        "next_cursor": next_cursor,
+        "search_query": q,
+        "memory_count": memory_count,
+        "suggestion": suggestion,
+        "top_header": True
+    }
+    return await arender(request, "main/memory_capsule.html", context)
+
+
+def _read_video(request):
+    return request.FILES.get("video")
+
+
+@login_required(login_url='login')
+@csrf_exempt
+async def upload_sos_video(request):
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Invalid request."}, status=400)
+
+    # Parsing the multipart body and writing the video are plain file I/O:
+    # they run on the thread pool, not on the thread the ORM calls share.
+    video_file = await sync_to_async(_read_video, thread_sensitive=False)(request)
+    if video_file is None:
+        return JsonResponse({"status": "error", "message": "Invalid request."}, status=400)
+    user = await request.auser()
+    filepath = await sync_to_async(save_video, thread_sensitive=False)(user, video_file)
+
+    await sync_to_async(alert_contacts)(user, filepath)
+    return JsonResponse({"status": "success", "message": "SOS video saved, alerts are being sent."})
@@ -0,0 +1,151 @@
+import math
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import page_cache
+from .models import Place
+
+# name -> (url name, needs a place id, query string, logged in)
+BENCHMARKS = {
+    'places_listing': ('place_listing', False, {'q1': 'Kaski'}, False),
+    'places_listing_browse': ('place_listing', False, {}, False),
+    'memoryCapsule': ('memory_capsule', False, {}, True),
+    'guideListing': ('guide_listing', False, {'language': 'English'}, False),
+    'dashboard': ('dashboard', False, {}, True),
+    'place_detail': ('place_detail', True, {}, False),
+}
+
+# Most SQL queries one uncached request may run. They do not grow with the
+# amount of data; a view going over its budget has picked up an N+1. Views
+# behind the page cache spend one of them reading the scope versions.
+QUERY_BUDGETS = {
+    'places_listing': 2,
+    'places_listing_browse': 2,
+    'memoryCapsule': 5,
+    'guideListing': 4,
+    'dashboard': 3,
+    # The place, its nearby places (and the coordinate index version) and
+    # its similar places (one indexed join)
+    'place_detail': 5,
+}
+
+# The pages served by async views under ASGI; the server comparison loads these
+SERVER_BENCHMARKS = ['places_listing', 'place_detail', 'guideListing', 'memoryCapsule']
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def _url(name, place_id):
+    url_name, needs_place, query, _ = BENCHMARKS[name]
+    url = reverse(url_name, args=[place_id] if needs_place else [])
+    if query:
+        url += '?' + '&'.join(f"{key}={value}" for key, value in query.items())
+    return url
+
+
+def run_benchmarks(names=None, runs=20, warm_cache=False):
+    """
+    Request each view `runs` times through the test client and return one
+    result dict per view: latency percentiles, the most queries any request
+    ran, the budget and whether it was kept.
+
+    Unless warm_cache is set the page cache is invalidated before every
+    request, so the numbers are for rendering the view, not a cache hit.
+    """
+    names = names or list(BENCHMARKS)
+    user = get_user_model().objects.filter(is_active=True).order_by('id').first()
+    place_id = Place.objects.order_by('id').values_list('id', flat=True).first()
+    if user is None or place_id is None:
+        raise LookupError("Benchmarks need at least one user and one place; run seed_synthetic first")
+
+    anonymous = Client(HTTP_HOST='localhost')
+    signed_in = Client(HTTP_HOST='localhost')
+    signed_in.force_login(user)
+
+    results = []
+    for name in names:
+        client = signed_in if BENCHMARKS[name][3] else anonymous
+        url = _url(name, place_id)
+        client.get(url)  # warm-up: imports, template loading, numpy index
+
+        timings, query_counts = [], []
+        for _ in range(runs):
+            if not warm_cache:
+                page_cache.bump('place', 'guide')
+            with ExitStack() as stack:
+                captures = [stack.enter_context(CaptureQueriesContext(connection))
+                            for connection in connections.all()]
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{name}: GET {url} returned {response.status_code}")
+            query_counts.append(sum(len(capture.captured_queries) for capture in captures))
+
+        budget = QUERY_BUDGETS.get(name)
+        queries = max(query_counts)
+        results.append({
+            'view': name,
+            'url': url,
+            'runs': runs,
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'queries': queries,
+            'budget': budget,
+            'within_budget': budget is None or queries <= budget,
+        })
+    return results
+
+
+def benchmark_paths(names=None):
+    place_id = Place.objects.order_by('id').values_list('id', flat=True).first()
+    if place_id is None:
+        raise LookupError("Benchmarks need at least one place; run seed_synthetic first")
+    return [_url(name, place_id) for name in names or SERVER_BENCHMARKS]
+
+
+def _fetch(url, timeout):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return ok, (time.perf_counter() - started) * 1000
+
+
+def run_load(base_url, paths, concurrency=32, requests=500, timeout=30):
+    """
+    Send `requests` anonymous GETs to a running server, `concurrency` at a
+    time, cycling through paths. Run it against the WSGI and the ASGI server
+    with the same arguments to compare them under the same load.
+    """
+    urls = [base_url.rstrip('/') + path for path in paths]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda index: _fetch(urls[index % len(urls)], timeout), range(requests)))
+    seconds = time.perf_counter() - started
+
+    timings = [ms for ok, ms in results if ok]
+    return {
+        'server': base_url,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': sum(1 for ok, _ in results if not ok),
+        'requests_per_second': round(len(timings) / seconds, 1),
+        'p50_ms': round(percentile(timings, 0.50), 2) if timings else None,
+        'p95_ms': round(percentile(timings, 0.95), 2) if timings else None,
+    }
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # Under ASGI the site runs as several worker processes; each would warm
+    # and hold its own copy of every cached page and fragment
+    backend = settings.CACHES['default']['BACKEND']
+    if getattr(settings, 'SERVER_MODE', 'wsgi') == 'asgi' and backend.endswith('.LocMemCache'):
+        return [Error(
+            "SERVER_MODE=asgi needs a cache shared by its worker processes, not local memory.",
+            hint="Set CACHE_URL to a file or Redis cache, e.g. filecache:///var/tmp/ghumfir.",
+            id='main.E001',
+        )]
+    return []
@@ -0,0 +1,239 @@
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Two levels of 256 directories under each upload_to folder:
+# Memories/3f/a2/3fa2...c9.jpg
+SHARD_DEPTH = 2
+INCOMING_DIR = '.incoming'
+CONTENT_NAME = re.compile(r'(?:^|/)(?:[0-9a-f]{2}/){%d}[0-9a-f]{64}(?:\.\w+)?$' % SHARD_DEPTH)
+
+# Files nothing points at are only removed once they are this old, so an
+# upload whose row is not committed yet is not collected from under it.
+ORPHAN_GRACE = timedelta(hours=1)
+BATCH_SIZE = 500
+
+
+def content_name(prefix, digest, extension):
+    shards = [digest[index * 2:index * 2 + 2] for index in range(SHARD_DEPTH)]
+    return '/'.join(part for part in [prefix, *shards, digest + extension] if part)
+
+
+def is_content_addressed(name):
+    return bool(name and CONTENT_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Media storage that names every file after the SHA-256 of its bytes and
+    shards it into nested directories below its upload_to folder. Saving
+    bytes that are already stored writes nothing new; main.StoredFile counts
+    the references and delete() removes the file with the last one.
+
+    Names that are not content addressed (files from before this storage,
+    see the rehome_media command) are deleted directly as before.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # _save names the file after its content: same bytes, same name
+        return name
+
+    def _save(self, name, content):
+        fd, temp_path = self.incoming_file()
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return self.adopt(temp_path, name, digest.hexdigest(), size)
+
+    def incoming_file(self):
+        """(fd, path) of a new temporary file on the same filesystem as the stored files."""
+        incoming = self.path(INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        return tempfile.mkstemp(dir=incoming)
+
+    def adopt(self, temp_path, name, digest, size, retain=True):
+        """
+        Move a file from incoming_file() whose SHA-256 the caller already
+        knows into place and take a reference to it (or leave that to a
+        later retain_all()). name gives the folder and extension; returns
+        the stored name.
+        """
+        name = content_name(os.path.dirname(name), digest, os.path.splitext(name)[1].lower())
+        try:
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            # Replacing an existing copy swaps identical bytes atomically
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        if retain:
+            self.retain(name, size=size)
+        return name
+
+    def retain(self, name, count=1, size=None):
+        StoredFile = apps.get_model('main', 'StoredFile')
+        with transaction.atomic():
+            stored, created = StoredFile.objects.get_or_create(
+                name=name, defaults={'size': self.size(name) if size is None else size, 'references': count},
+            )
+            if not created:
+                StoredFile.objects.filter(pk=stored.pk).update(references=F('references') + count)
+
+    def retain_all(self, files):
+        """Take one reference per (name, size) pair with a handful of queries."""
+        StoredFile = apps.get_model('main', 'StoredFile')
+        counts = Counter(name for name, _ in files)
+        sizes = dict(files)
+        with transaction.atomic():
+            existing = set(StoredFile.objects.filter(name__in=list(counts)).values_list('name', flat=True))
+            new = [StoredFile(name=name, size=sizes[name], references=count)
+                   for name, count in counts.items() if name not in existing]
+            try:
+                with transaction.atomic():
+                    StoredFile.objects.bulk_create(new)
+            except IntegrityError:
+                # Another upload of the same bytes created a row first
+                for stored in new:
+                    self.retain(stored.name, stored.references, stored.size)
+
+            by_count = {}
+            for name in existing:
+                by_count.setdefault(counts[name], []).append(name)
+            for count, names in by_count.items():
+                StoredFile.objects.filter(name__in=names).update(references=F('references') + count)
+
+    def delete(self, name):
+        if not is_content_addressed(name):
+            return super().delete(name)
+
+        StoredFile = apps.get_model('main', 'StoredFile')
+        with transaction.atomic():
+            if StoredFile.objects.filter(name=name, references__gt=1).update(references=F('references') - 1):
+                return
+            removed, _ = StoredFile.objects.filter(name=name).delete()
+        # A name with no row is left alone; recount_references sorts it out
+        if removed:
+            transaction.on_commit(lambda: self.delete_if_unreferenced(name))
+
+    def delete_if_unreferenced(self, name):
+        StoredFile = apps.get_model('main', 'StoredFile')
+        if not StoredFile.objects.filter(name=name).exists():
+            super().delete(name)
+
+
+def release(file):
+    """Give up one reference to a FieldFile's content; files kept elsewhere are left alone."""
+    if file and isinstance(file.storage, ContentAddressedStorage) and is_content_addressed(file.name):
+        file.storage.delete(file.name)
+
+
+def managed_file_fields():
+    """(model, field name) for every FileField stored by a ContentAddressedStorage."""
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def recount_references(storage=None):
+    """
+    Set every StoredFile's count to the number of rows pointing at it and
+    delete files nothing has pointed at for ORPHAN_GRACE. Returns
+    (corrected, removed).
+    """
+    storage = storage or default_storage
+    StoredFile = apps.get_model('main', 'StoredFile')
+    counts = Counter()
+    for model, field in managed_file_fields():
+        names = model._default_manager.exclude(**{field: ''}).exclude(**{f"{field}__isnull": True})
+        counts.update(name for name in names.values_list(field, flat=True).iterator() if is_content_addressed(name))
+
+    corrected = 0
+    with transaction.atomic():
+        stored = dict(StoredFile.objects.values_list('name', 'references'))
+        for name, references in counts.items():
+            if name not in stored:
+                if storage.exists(name):
+                    StoredFile.objects.create(name=name, size=storage.size(name), references=references)
+                    corrected += 1
+            elif stored[name] != references:
+                StoredFile.objects.filter(name=name).update(references=references)
+                corrected += 1
+
+        settled = StoredFile.objects.filter(created_at__lt=timezone.now() - ORPHAN_GRACE)
+        removed = sorted(set(settled.values_list('name', flat=True)) - counts.keys())
+        for start in range(0, len(removed), BATCH_SIZE):
+            StoredFile.objects.filter(name__in=removed[start:start + BATCH_SIZE]).delete()
+    for name in removed:
+        FileSystemStorage.delete(storage, name)
+    return corrected, len(removed)
+
+
+def rehome_files(storage=None, dry_run=False, keep_originals=False):
+    """
+    Move every file a managed FileField points at under its old flat name
+    into content-addressed storage and repoint the rows; identical files
+    collapse into one. Returns (moved names, missing names, bytes saved by
+    deduplication).
+    """
+    storage = storage or default_storage
+    StoredFile = apps.get_model('main', 'StoredFile')
+    known = set(StoredFile.objects.values_list('name', flat=True))
+    moved = {}  # old name -> new name
+    missing = set()
+    duplicate_bytes = 0
+
+    for model, field in managed_file_fields():
+        rows = model._default_manager.exclude(**{field: ''}).exclude(**{f"{field}__isnull": True})
+        max_length = model._meta.get_field(field).max_length
+        names = [name for name in rows.values_list(field, flat=True).distinct() if not is_content_addressed(name)]
+        for name in names:
+            if name in moved or name in missing:
+                continue
+            if not storage.exists(name):
+                missing.add(name)
+                continue
+            if dry_run:
+                moved[name] = None
+                continue
+            with storage.open(name, 'rb') as original:
+                new_name = storage.save(name, original, max_length=max_length)
+            if new_name in known:
+                duplicate_bytes += storage.size(new_name)
+            known.add(new_name)
+            moved[name] = new_name
+
+        if not dry_run:
+            for name in names:
+                if name in moved:
+                    rows.filter(**{field: name}).update(**{field: moved[name]})
+
+    if not dry_run:
+        recount_references(storage)
+        if not keep_originals:
+            for name in moved:
+                FileSystemStorage.delete(storage, name)
+    return list(moved), sorted(missing), duplicate_bytes
@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.db import connections
+
+READ_ALIAS = 'replica'
+WRITE_ALIAS = 'default'
+
+_reading = ContextVar('main_read_only_view', default=False)
+
+
+@contextmanager
+def reading_from_replica():
+    token = _reading.set(True)
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+def read_only_view(view):
+    """Serve the view's queries from the read alias when one is configured."""
+    if iscoroutinefunction(view):
+        # The context variable is copied into the threads sync_to_async runs
+        # the ORM on, so the async views route the same way
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with reading_from_replica():
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with reading_from_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """
+    Reads made inside a read_only_view go to the 'replica' alias, everything
+    else (and every write) to 'default'. Without a replica alias all traffic
+    goes to 'default', so the router is safe to install everywhere. Works the
+    same for SQLite (a second, query_only connection to the WAL file) and
+    PostgreSQL (a connection to a standby or a read-only role).
+    """
+
+    def db_for_read(self, model, **hints):
+        if _reading.get() and READ_ALIAS in connections.databases:
+            return READ_ALIAS
+        return WRITE_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return WRITE_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == WRITE_ALIAS
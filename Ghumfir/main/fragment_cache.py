@@ -0,0 +1,61 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.template import Context
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+# Rendered template fragments. A card is keyed by its object's primary key and
+# version (bumped on every change that shows on it), so an edit makes the
+# next render miss instead of anyone deleting the old entry. Every key also
+# covers the fragment template's source and the static manifest, so a deploy
+# that changes the markup or the hashed asset names starts from fresh entries.
+FRAGMENT_KEY = 'main:fragment:{digest}'
+
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def fragment_key(template, *vary_on):
+    parts = [
+        template.origin.template_name or '',
+        hashlib.md5(template.source.encode()).hexdigest(),
+        getattr(staticfiles_storage, 'manifest_hash', ''),
+        *(str(value) for value in vary_on),
+    ]
+    return FRAGMENT_KEY.format(digest=hashlib.md5('|'.join(parts).encode()).hexdigest())
+
+
+def render_cards(template_name, objects, name):
+    """
+    template_name rendered once per object, with the object as `name` and
+    nothing else in the context, joined together. All the cards of a page
+    are fetched with one cache round trip and only the misses are rendered.
+    The objects need a `version` field.
+    """
+    # The engine's own template: the backend wrapper's render() is timed by
+    # main.metrics, which would count cards inside a page render twice
+    template = get_template(template_name).template
+    objects = list(objects)
+    keys = [fragment_key(template, obj._meta.label_lower, obj.pk, obj.version) for obj in objects]
+    cached = cache.get_many(keys)
+
+    rendered = {}
+    for key, obj in zip(keys, objects):
+        if key not in cached and key not in rendered:
+            rendered[key] = template.render(Context({name: obj}, autoescape=template.engine.autoescape))
+    if rendered:
+        cache.set_many(rendered, FRAGMENT_CACHE_TIMEOUT)
+    cached.update(rendered)
+    return mark_safe(''.join(cached[key] for key in keys))
+
+
+def render_shared(template, context, vary_on):
+    """A template rendered with the current context, cached for every page whose vary_on values match."""
+    key = fragment_key(template, *vary_on)
+    html = cache.get(key)
+    if html is None:
+        html = template.render(context)
+        cache.set(key, html, FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -0,0 +1,102 @@
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import Substr
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+# Geohash length used as the clustering grid for each Leaflet zoom level,
+# roughly one cell per 60-80px of screen.
+ZOOM_PRECISION = [1, 1, 1, 2, 2, 3, 3, 3, 4, 4, 5, 5, 5, 6, 6]
+
+# Past this zoom (or below this many places in view) markers are not clustered.
+CLUSTER_MAX_ZOOM = len(ZOOM_PRECISION) - 1
+CLUSTER_MIN_PLACES = 100
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    if latitude is None or longitude is None:
+        return ''
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def parse_bbox(value):
+    """'south,west,north,east' -> tuple of floats, or None if malformed."""
+    try:
+        south, west, north, east = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90 <= south <= north <= 90) or not (-180 <= west <= 180 and -180 <= east <= 180):
+        return None
+    return south, west, north, east
+
+
+def places_in_bbox(queryset, bbox):
+    south, west, north, east = bbox
+    queryset = queryset.filter(latitude__gte=south, latitude__lte=north)
+    if west <= east:
+        return queryset.filter(longitude__gte=west, longitude__lte=east)
+    # Box crosses the antimeridian
+    return queryset.filter(longitude__gte=west) | queryset.filter(longitude__lte=east)
+
+
+def cluster_places(queryset, bbox, zoom):
+    """
+    Markers for the visible part of the map.
+
+    Returns {'clusters': [...], 'places': [...]}. Places are grouped by their
+    geohash prefix for the zoom level; cells holding a single place come back
+    as plain places.
+    """
+    places = places_in_bbox(queryset, bbox)
+    fields = ('id', 'name', 'region', 'latitude', 'longitude')
+
+    if zoom > CLUSTER_MAX_ZOOM or places.count() <= CLUSTER_MIN_PLACES:
+        return {'clusters': [], 'places': list(places.values(*fields))}
+
+    precision = ZOOM_PRECISION[max(zoom, 0)]
+    cells = list(
+        places.annotate(cell=Substr('geohash', 1, precision))
+        .values('cell')
+        .annotate(
+            count=Count('id'),
+            center_latitude=Avg('latitude'), center_longitude=Avg('longitude'),
+            south=Min('latitude'), north=Max('latitude'),
+            west=Min('longitude'), east=Max('longitude'),
+        )
+        .order_by()
+    )
+    for cell in cells:
+        cell['latitude'] = cell.pop('center_latitude')
+        cell['longitude'] = cell.pop('center_longitude')
+
+    single_cells = [cell['cell'] for cell in cells if cell['count'] == 1]
+    clusters = [cell for cell in cells if cell['count'] > 1]
+    singles = []
+    if single_cells:
+        singles = list(
+            places.annotate(cell=Substr('geohash', 1, precision))
+            .filter(cell__in=single_cells)
+            .values(*fields)
+        )
+    return {'clusters': clusters, 'places': singles}
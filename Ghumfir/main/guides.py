@@ -0,0 +1,187 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Q
+
+from .models import GuideProfile, Language
+from .pagination import decode_cursor, encode_cursor
+
+GUIDE_PAGE_SIZE = 12
+
+# (key, label, min inclusive, max exclusive) in NPR per hour
+RATE_BANDS = [
+    ('under-1000', 'Under 1,000', None, 1000),
+    ('1000-2500', '1,000 - 2,500', 1000, 2500),
+    ('2500-5000', '2,500 - 5,000', 2500, 5000),
+    ('5000-plus', '5,000+', 5000, None),
+]
+
+LANGUAGE_SPLIT_RE = re.compile(r'\s*(?:[,/;&]|\band\b)\s*', re.IGNORECASE)
+
+
+def parse_languages(text):
+    """'nepali, English and hindi' -> ['Nepali', 'English', 'Hindi']"""
+    names = []
+    for part in LANGUAGE_SPLIT_RE.split(text or ''):
+        name = ' '.join(word.capitalize() for word in part.split())[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def sync_guide_languages(guide):
+    names = parse_languages(guide.languages)
+    Language.objects.bulk_create([Language(name=name) for name in names], ignore_conflicts=True)
+    guide.spoken_languages.set(Language.objects.filter(name__in=names))
+
+
+def parse_guide_filters(params):
+    experience_values = {value for value, _ in GuideProfile.EXPERIENCE_YEARS}
+    rate_keys = {key for key, *_ in RATE_BANDS}
+    return {
+        'q': params.get('q', '').strip(),
+        'language': [name for name in params.getlist('language') if name],
+        'experience': [value for value in params.getlist('experience') if value in experience_values],
+        'rate': [key for key in params.getlist('rate') if key in rate_keys],
+        'licensed': params.get('licensed') == '1',
+        'verified': params.get('verified') == '1',
+    }
+
+
+def _speaks(condition):
+    through = GuideProfile.spoken_languages.through
+    return Q(pk__in=through.objects.filter(**condition).values('guideprofile_id'))
+
+
+def _rate_q(key):
+    for band_key, _, low, high in RATE_BANDS:
+        if band_key == key:
+            q = Q()
+            if low is not None:
+                q &= Q(rate_per_hour__gte=low)
+            if high is not None:
+                q &= Q(rate_per_hour__lt=high)
+            return q
+    return Q()
+
+
+def _any_of(queries):
+    combined = Q()
+    for query in queries:
+        combined |= query
+    return combined
+
+
+def _text_q(q):
+    if not q:
+        return Q()
+    return (
+        Q(primary_location__icontains=q) |
+        Q(secondary_location__icontains=q) |
+        Q(user__first_name__icontains=q) |
+        Q(user__last_name__icontains=q) |
+        _speaks({'language__name__icontains': q})
+    )
+
+
+def _facet_filters(filters):
+    """One Q per facet; values inside a facet are OR'ed, facets are AND'ed."""
+    facets = {}
+    if filters['language']:
+        facets['language'] = _speaks({'language__name__in': filters['language']})
+    if filters['experience']:
+        facets['experience'] = Q(experience__in=filters['experience'])
+    if filters['rate']:
+        facets['rate'] = _any_of(_rate_q(key) for key in filters['rate'])
+    if filters['licensed']:
+        facets['licensed'] = Q(Licenced=True)
+    if filters['verified']:
+        facets['verified'] = Q(is_verified=True)
+    return facets
+
+
+def _all_except(facets, skip=None):
+    combined = Q()
+    for name, query in facets.items():
+        if name != skip:
+            combined &= query
+    return combined
+
+
+def _facet_counts(base, filters, facets):
+    # Each facet is counted with every other selected facet applied, but not
+    # its own, so picking "English" still shows how many speak Hindi. All the
+    # scalar facets come out of a single aggregate query.
+    aggregates = {'total': Count('id', filter=_all_except(facets))}
+    for index, (value, _) in enumerate(GuideProfile.EXPERIENCE_YEARS):
+        aggregates[f'experience_{index}'] = Count(
+            'id', filter=Q(experience=value) & _all_except(facets, 'experience'))
+    for index, (key, *_) in enumerate(RATE_BANDS):
+        aggregates[f'rate_{index}'] = Count('id', filter=_rate_q(key) & _all_except(facets, 'rate'))
+    aggregates['licensed'] = Count('id', filter=Q(Licenced=True) & _all_except(facets, 'licensed'))
+    aggregates['verified'] = Count('id', filter=Q(is_verified=True) & _all_except(facets, 'verified'))
+    counts = base.aggregate(**aggregates)
+
+    languages = (
+        base.filter(_all_except(facets, 'language'))
+        .filter(spoken_languages__isnull=False)
+        .values('spoken_languages__name')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'spoken_languages__name')
+    )
+
+    return counts['total'], {
+        'language': [
+            {'value': row['spoken_languages__name'], 'label': row['spoken_languages__name'],
+             'count': row['count'], 'selected': row['spoken_languages__name'] in filters['language']}
+            for row in languages
+        ],
+        'experience': [
+            {'value': value, 'label': label, 'count': counts[f'experience_{index}'],
+             'selected': value in filters['experience']}
+            for index, (value, label) in enumerate(GuideProfile.EXPERIENCE_YEARS)
+        ],
+        'rate': [
+            {'value': key, 'label': label, 'count': counts[f'rate_{index}'], 'selected': key in filters['rate']}
+            for index, (key, label, *_) in enumerate(RATE_BANDS)
+        ],
+        'licensed': {'count': counts['licensed'], 'selected': filters['licensed']},
+        'verified': {'count': counts['verified'], 'selected': filters['verified']},
+    }
+
+
+def _decode_guide_cursor(cursor):
+    after = decode_cursor(cursor, [str, int])
+    if after is None:
+        return None
+    try:
+        rating = Decimal(after[0])
+    except InvalidOperation:
+        return None
+    return (rating, after[1]) if rating.is_finite() else None
+
+
+def search_guides(filters, cursor=None, page_size=GUIDE_PAGE_SIZE):
+    """
+    One page of guides matching the text query and facet filters, best rated
+    first, plus the total and the facet counts.
+
+    Returns (guides, next_cursor, total, facets).
+    """
+    base = GuideProfile.objects.filter(_text_q(filters['q']))
+    facets = _facet_filters(filters)
+    total, facet_counts = _facet_counts(base, filters, facets)
+
+    guides = base.filter(_all_except(facets)).select_related('user').order_by('-rating', 'id')
+    after = _decode_guide_cursor(cursor)
+    if after:
+        rating, guide_id = after
+        guides = guides.filter(Q(rating__lt=rating) | Q(rating=rating, id__gt=guide_id))
+
+    guides = list(guides[:page_size + 1])
+    next_cursor = None
+    if len(guides) > page_size:
+        guides = guides[:page_size]
+        last = guides[-1]
+        next_cursor = encode_cursor([str(last.rating), last.id])
+    return guides, next_cursor, total, facet_counts
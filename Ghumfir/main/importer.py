@@ -0,0 +1,266 @@
+import time
+
+import pandas as pd
+from django.db import DatabaseError, transaction
+from openpyxl import load_workbook
+
+from .geo import geohash_encode
+from .models import Place
+from .signals import places_bulk_changed
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 5000
+
+NAME_COLUMN = 'Place Name'
+
+# Place field -> spreadsheet column
+TEXT_COLUMNS = {
+    'region': 'Region/District',
+    'destination_type': 'Type of Destination',
+    'popularity': 'Popularity',
+    'best_season': 'Best Season to Visit',
+    'starting_point': 'Starting Point',
+    'route_overview': 'Route Overview',
+    'ending_point': 'Ending Point',
+    'difficulty': 'Difficulty Level',
+    'transportation_access': 'Transportation Access',
+    'lodges_hotels': 'Available Lodges/Hotels',
+    'food_availability': 'Food Availability',
+    'emergency_facilities': 'Emergency Facilities',
+    'local_community': 'Local Community/Ethnic Group',
+    'cultural_attractions': 'Cultural Attractions',
+    'language_customs': 'Language & Customs',
+    'unique_traditions': 'Unique Traditions',
+    'adventure_type': 'Adventure Type',
+    'not_to_miss_spots': 'Not-to-Miss Spots',
+    'wildlife_highlights': 'Wildlife/Nature Highlights',
+    'photography_hotspots': 'Photography Hotspots',
+}
+
+NUMERIC_COLUMNS = {
+    'duration_days': 'Duration (Days)',
+    'altitude_m': 'Altitude/Elevation (Meters)',
+    'latitude': 'Latitude',
+    'longitude': 'Longitude',
+}
+
+BOOLEAN_COLUMNS = {
+    'permit_required': 'Permit Required',
+}
+
+INTEGER_FIELDS = {'duration_days', 'altitude_m'}
+
+IMPORT_FIELDS = ['name'] + list(TEXT_COLUMNS) + list(NUMERIC_COLUMNS) + list(BOOLEAN_COLUMNS) + [
+    'geohash', 'content_hash',
+]
+UPDATE_FIELDS = [field for field in IMPORT_FIELDS if field != 'name']
+
+
+def parse_numeric(value):
+    """
+    Safely converts string or numeric input to a float.
+    Handles ranges like '0.5-1' -> 0.75, returns None for invalid/empty data.
+    """
+    if value is None or str(value).strip() == '' or str(value).lower() == 'nan':
+        return None
+    try:
+        value = str(value).strip()
+        if '-' in value:
+            parts = [float(p) for p in value.split('-') if p]
+            if len(parts) == 2:
+                return sum(parts) / 2
+        return float(value)
+    except Exception:
+        return None
+
+
+def _clean_columns(df):
+    # Normalize column names (trim spaces)
+    df.columns = [str(column).strip() for column in df.columns]
+    return df
+
+
+def iter_sheet(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Yield a CSV or Excel sheet as DataFrames of at most chunk_size rows, so
+    memory stays bounded however large the file is.
+    """
+    if file_path.lower().endswith('.csv'):
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size, dtype=str):
+            yield _clean_columns(chunk)
+        return
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        batch = []
+        for row in rows:
+            if all(cell is None for cell in row):
+                continue
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield _clean_columns(pd.DataFrame(batch, columns=header))
+                batch = []
+        if batch:
+            yield _clean_columns(pd.DataFrame(batch, columns=header))
+    finally:
+        workbook.close()
+
+
+def _text(df, column):
+    if column not in df:
+        return pd.Series('', index=df.index, dtype=object)
+    return df[column].fillna('').astype(str).str.strip()
+
+
+def frame_to_places(df, first_row=0, seen=None):
+    """
+    Turn a chunk of the sheet into unsaved Place objects, column by column.
+
+    Returns (places, errors) where errors is a list of (row_number, name, message)
+    for rows that cannot be imported. Row numbers are 1-based sheet rows and
+    first_row is the number of data rows in earlier chunks. seen maps names to
+    the row they were first found on and is shared between chunks.
+    """
+    if seen is None:
+        seen = {}
+    if NAME_COLUMN not in df:
+        raise ValueError(f"Missing required column '{NAME_COLUMN}'")
+
+    columns = {'name': _text(df, NAME_COLUMN)}
+    for field, column in TEXT_COLUMNS.items():
+        columns[field] = _text(df, column)
+    for field, column in NUMERIC_COLUMNS.items():
+        if column not in df:
+            columns[field] = pd.Series(float('nan'), index=df.index)
+            continue
+        values = df[column].map(parse_numeric).astype(float)
+        columns[field] = values.round() if field in INTEGER_FIELDS else values
+    for field, column in BOOLEAN_COLUMNS.items():
+        columns[field] = _text(df, column).str.lower().isin(['yes', 'true', 'y'])
+
+    frame = pd.DataFrame(columns)
+    max_lengths = {
+        field.name: field.max_length for field in Place._meta.get_fields()
+        if field.name in columns and getattr(field, 'max_length', None)
+    }
+
+    places = []
+    errors = []
+    in_chunk = {}  # name -> index in places
+    for offset, record in enumerate(frame.to_dict('records')):
+        row_number = first_row + offset + 2  # header is row 1
+        name = record['name']
+        if not name or name.lower() == 'nan':
+            errors.append((row_number, '', "missing place name"))
+            continue
+        too_long = [field for field, length in max_lengths.items() if len(record[field] or '') > length]
+        if too_long:
+            errors.append((row_number, name, f"value too long for {', '.join(too_long)}"))
+            continue
+        if name in seen:
+            errors.append((row_number, name, f"duplicate of row {seen[name]}, later row wins"))
+            if name in in_chunk:
+                places[in_chunk[name]] = None
+        seen[name] = row_number
+        in_chunk[name] = len(places)
+
+        for field in NUMERIC_COLUMNS:
+            value = record[field]
+            if pd.isna(value):
+                record[field] = None
+            elif field in INTEGER_FIELDS:
+                record[field] = int(value)
+        record['geohash'] = geohash_encode(record['latitude'], record['longitude'])
+        place = Place(**record)
+        place.content_hash = place.compute_content_hash()
+        places.append(place)
+
+    return [place for place in places if place is not None], errors
+
+
+def write_places(places, batch_size=BATCH_SIZE):
+    """
+    Upsert places by name in batched transactions.
+    Returns a list of (name, message) for places that failed to write.
+    """
+    errors = []
+    for start in range(0, len(places), batch_size):
+        batch = places[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                Place.objects.bulk_create(
+                    batch, update_conflicts=True, unique_fields=['name'], update_fields=UPDATE_FIELDS,
+                )
+        except DatabaseError:
+            # Find the offending rows by retrying the batch one place at a time
+            for place in batch:
+                try:
+                    with transaction.atomic():
+                        Place.objects.bulk_create(
+                            [place], update_conflicts=True, unique_fields=['name'], update_fields=UPDATE_FIELDS,
+                        )
+                except DatabaseError as e:
+                    errors.append((place.name, str(e)))
+    return errors
+
+
+def import_places(file_path, batch_size=BATCH_SIZE, chunk_size=CHUNK_SIZE, dry_run=False, delete_missing=False):
+    """
+    Import a places sheet (CSV or Excel), writing only rows whose content hash
+    differs from the stored one.
+
+    Returns a stats dict: names inserted/updated/deleted, the unchanged count,
+    errors and throughput. With dry_run nothing is written and the stats are
+    the diff the import would apply. "deleted" are places missing from the
+    file; they are only removed with delete_missing.
+    """
+    started = time.perf_counter()
+    existing = dict(Place.objects.values_list('name', 'content_hash'))
+    seen = {}
+    changes = {}  # name -> 'inserted' or 'updated', first classification wins
+    stats = {
+        'rows': 0, 'inserted': [], 'updated': [], 'unchanged': 0, 'deleted': [],
+        'row_errors': [], 'write_errors': [],
+    }
+
+    for df in iter_sheet(file_path, chunk_size):
+        places, row_errors = frame_to_places(df, stats['rows'], seen)
+        stats['rows'] += len(df)
+        stats['row_errors'] += row_errors
+
+        changed = []
+        for place in places:
+            previous = existing.get(place.name)
+            if previous == place.content_hash:
+                stats['unchanged'] += 1
+                continue
+            changes.setdefault(place.name, 'inserted' if previous is None else 'updated')
+            existing[place.name] = place.content_hash
+            changed.append(place)
+
+        if not dry_run and changed:
+            write_errors = write_places(changed, batch_size)
+            stats['write_errors'] += write_errors
+            failed = {name for name, _ in write_errors}
+            places_bulk_changed(place.name for place in changed if place.name not in failed)
+
+    failed = {name for name, _ in stats['write_errors']}
+    for name, kind in changes.items():
+        if name not in failed:
+            stats[kind].append(name)
+
+    # A row that failed validation still names its place: never treat it as gone
+    rejected = {name for _, name, _ in stats['row_errors']}
+    stats['deleted'] = [name for name in existing if name not in seen and name not in rejected]
+    if delete_missing and not dry_run:
+        for start in range(0, len(stats['deleted']), batch_size):
+            Place.objects.filter(name__in=stats['deleted'][start:start + batch_size]).delete()
+
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = elapsed
+    stats['rows_per_second'] = stats['rows'] / elapsed if elapsed else 0
+    return stats
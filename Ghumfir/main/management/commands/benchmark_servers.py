@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmark import SERVER_BENCHMARKS, benchmark_paths, run_load
+
+
+class Command(BaseCommand):
+    help = (
+        "Load running WSGI and ASGI servers with the same concurrent requests and compare throughput and latency. "
+        "Start them first, e.g. `gunicorn Ghumfir.wsgi --threads 8` and "
+        "`uvicorn Ghumfir.asgi:application`, with the same number of workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', help='Base URL of the WSGI server, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--asgi', help='Base URL of the ASGI server, e.g. http://127.0.0.1:8001')
+        parser.add_argument('--concurrency', default='1,8,32,64',
+                            help='Comma separated numbers of requests kept in flight')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per server and concurrency level')
+        parser.add_argument('--views', default=','.join(SERVER_BENCHMARKS), help='Pages to request, in turn')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        servers = [(label, options[label]) for label in ('wsgi', 'asgi') if options[label]]
+        if not servers:
+            raise CommandError("Pass --wsgi and/or --asgi")
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+            paths = benchmark_paths([name.strip() for name in options['views'].split(',') if name.strip()])
+        except (ValueError, KeyError) as e:
+            raise CommandError(f"Bad --concurrency or --views: {e}")
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        results = []
+        self.stdout.write(f"{'server':<8}{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for concurrency in levels:
+            for label, base_url in servers:
+                result = dict(run_load(base_url, paths, concurrency, options['requests']), mode=label)
+                results.append(result)
+                line = (f"{label:<8}{concurrency:>12}{result['requests_per_second']:>10.1f}"
+                        f"{result['p50_ms'] or 0:>10.1f}{result['p95_ms'] or 0:>10.1f}{result['errors']:>8}")
+                self.stdout.write(self.style.ERROR(line) if result['errors'] else line)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Sent {options['requests']} requests per server and level"))
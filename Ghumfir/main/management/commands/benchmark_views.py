@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmark import BENCHMARKS, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Measure latency and SQL query counts of the hot views; fails when a query budget is exceeded"
+
+    def add_arguments(self, parser):
+        parser.add_argument('views', nargs='*', help=f"Views to run (default: all of {', '.join(BENCHMARKS)})")
+        parser.add_argument('--runs', type=int, default=20, help='Requests per view')
+        parser.add_argument('--warm-cache', action='store_true', help='Let the page cache serve repeat requests')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        unknown = [view for view in options['views'] if view not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Unknown views: {', '.join(unknown)}")
+        try:
+            results = run_benchmarks(options['views'], max(1, options['runs']), options['warm_cache'])
+        except (LookupError, RuntimeError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'view':<24}{'p50 ms':>10}{'p95 ms':>10}{'queries':>10}{'budget':>8}")
+        for result in results:
+            line = (f"{result['view']:<24}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+                    f"{result['queries']:>10}{result['budget'] if result['budget'] is not None else '-':>8}")
+            style = self.style.SUCCESS if result['within_budget'] else self.style.ERROR
+            self.stdout.write(style(line))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+        over = [result['view'] for result in results if not result['within_budget']]
+        if over:
+            raise CommandError(f"Query budget exceeded: {', '.join(over)}")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(results)} views within their query budgets"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from main.media import generate_variants
+from main.models import MemoryMedia
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail/display variants for memory images that do not have them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        media = MemoryMedia.objects.filter(media_type='image')
+        if not options['force']:
+            media = media.filter(variants_generated_at=None)
+
+        generated = 0
+        for media_id in media.values_list('id', flat=True).iterator():
+            try:
+                if generate_variants(media_id, force=options['force']):
+                    generated += 1
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Error processing media {media_id}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Generated variants for {generated} images"))
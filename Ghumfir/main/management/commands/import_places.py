@@ -1,75 +1,56 @@
 from django.core.management.base import BaseCommand
-import pandas as pd
-from main.models import Place  
 
+from main.importer import BATCH_SIZE, CHUNK_SIZE, import_places
 
-def parse_numeric(value):
-    """
-    Safely converts string or numeric input to a float.
-    Handles ranges like '0.5-1' -> 0.75, returns None for invalid/empty data.
-    """
-    if value is None or str(value).strip() == '' or str(value).lower() == 'nan':
-        return None
-    try:
-        value = str(value).strip()
-        if '-' in value:
-            parts = [float(p) for p in value.split('-') if p]
-            if len(parts) == 2:
-                return sum(parts) / 2
-        return float(value)
-    except Exception:
-        return None
+# Names listed per change type unless run with -v 2
+PREVIEW_NAMES = 10
 
 
 class Command(BaseCommand):
-    help = "Import places data from an Excel file into the database"
+    help = "Import places data from an Excel or CSV file, writing only places that changed"
 
     def add_arguments(self, parser):
-        parser.add_argument('file_path', type=str, help='Path to the Excel file')
+        parser.add_argument('file_path', type=str, help='Path to the Excel (.xlsx) or CSV file')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows written per transaction')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows read from the file at a time')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing')
+        parser.add_argument('--delete-missing', action='store_true',
+                            help='Delete places that are no longer in the file')
+
+    def _list_names(self, label, names, style, verbosity):
+        if not names:
+            return
+        shown = names if verbosity >= 2 else names[:PREVIEW_NAMES]
+        self.stdout.write(style(f"{label} ({len(names)}):"))
+        for name in shown:
+            self.stdout.write(f"  {name}")
+        if len(shown) < len(names):
+            self.stdout.write(f"  ... and {len(names) - len(shown)} more")
 
     def handle(self, *args, **options):
-        file_path = options['file_path']
-        df = pd.read_excel(file_path)
-
-        # Normalize column names (trim spaces)
-        df.columns = df.columns.str.strip()
-
-        imported_count = 0
-
-        for _, row in df.iterrows():
-            try:
-                Place.objects.update_or_create(
-                    name=row['Place Name'].strip(),
-                    defaults={
-                        'region': row.get('Region/District', ''),
-                        'destination_type': row.get('Type of Destination', ''),
-                        'popularity': row.get('Popularity', ''),
-                        'best_season': row.get('Best Season to Visit', ''),
-                        'starting_point': row.get('Starting Point', ''),
-                        'route_overview': row.get('Route Overview', ''),
-                        'ending_point': row.get('Ending Point', ''),
-                        'duration_days': parse_numeric(row.get('Duration (Days)', None)),
-                        'altitude_m': parse_numeric(row.get('Altitude/Elevation (Meters)', None)),
-                        'difficulty': row.get('Difficulty Level', ''),
-                        'transportation_access': row.get('Transportation Access', ''),
-                        'lodges_hotels': row.get('Available Lodges/Hotels', ''),
-                        'food_availability': row.get('Food Availability', ''),
-                        'permit_required': str(row.get('Permit Required', '')).lower() in ['yes', 'true', 'y'],
-                        'emergency_facilities': row.get('Emergency Facilities', ''),
-                        'local_community': row.get('Local Community/Ethnic Group', ''),
-                        'cultural_attractions': row.get('Cultural Attractions', ''),
-                        'language_customs': row.get('Language & Customs', ''),
-                        'unique_traditions': row.get('Unique Traditions', ''),
-                        'adventure_type': row.get('Adventure Type', ''),
-                        'not_to_miss_spots': row.get('Not-to-Miss Spots', ''),
-                        'wildlife_highlights': row.get('Wildlife/Nature Highlights', ''),
-                        'photography_hotspots': row.get('Photography Hotspots', ''),
-                        'latitude': parse_numeric(row.get('Latitude', None)),
-                        'longitude': parse_numeric(row.get('Longitude', None)),
-                    }
-                )
-                imported_count += 1
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Error importing {row['Place Name']}: {e}"))
-
-        self.stdout.write(self.style.SUCCESS(f"✅ Successfully imported {imported_count} places"))
+        dry_run = options['dry_run']
+        stats = import_places(
+            options['file_path'], options['batch_size'], options['chunk_size'],
+            dry_run=dry_run, delete_missing=options['delete_missing'],
+        )
+
+        for row_number, name, message in stats['row_errors']:
+            self.stdout.write(self.style.ERROR(f"Row {row_number} ({name or 'no name'}): {message}"))
+        for name, message in stats['write_errors']:
+            self.stdout.write(self.style.ERROR(f"Error importing {name}: {message}"))
+
+        verbosity = options['verbosity']
+        self._list_names("New", stats['inserted'], self.style.SUCCESS, verbosity)
+        self._list_names("Updated", stats['updated'], self.style.WARNING, verbosity)
+        deleted_label = "Deleted" if options['delete_missing'] else "Missing from file (kept, use --delete-missing)"
+        self._list_names(deleted_label, stats['deleted'], self.style.ERROR, verbosity)
+
+        summary = (
+            f"{len(stats['inserted'])} new, {len(stats['updated'])} updated, {stats['unchanged']} unchanged, "
+            f"{len(stats['deleted'])} {'deleted' if options['delete_missing'] else 'missing'} "
+            f"from {stats['rows']} rows in {stats['seconds']:.2f}s ({stats['rows_per_second']:.0f} rows/s)"
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"Dry run, nothing written: {summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Import finished: {summary}"))
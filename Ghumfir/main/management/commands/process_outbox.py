@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.outbox import BATCH_SIZE, process_outbox
+from main.sos import finalize_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Send queued outbox emails (SOS alerts), retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Emails sent per connection')
+
+    def handle(self, *args, **options):
+        while True:
+            stale = finalize_stale_uploads()
+            if stale:
+                self.stdout.write(f"Finalized {stale} abandoned SOS uploads")
+
+            sent, failed = process_outbox(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue  # more may be due, drain before sleeping
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS("✅ Outbox drained"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main.reviews import rebuild_guide_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute guide rating totals from their reviews"
+
+    def handle(self, *args, **options):
+        changed = rebuild_guide_ratings()
+        self.stdout.write(self.style.SUCCESS(f"✅ Corrected the rating totals of {changed} guides"))
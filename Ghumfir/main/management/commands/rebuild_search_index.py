@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from main.models import Place
+from main.search import fts_enabled, rebuild_place_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for places"
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING("Full-text index is only used on SQLite, nothing to do."))
+            return
+
+        rebuild_place_index()
+        self.stdout.write(self.style.SUCCESS(f"✅ Indexed {Place.objects.count()} places"))
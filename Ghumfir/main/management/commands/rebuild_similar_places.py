@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from main.similar import SIMILAR_LIMIT, rebuild_similar_places
+
+
+class Command(BaseCommand):
+    help = "Recompute the similar places shown on place pages, for places whose text changed since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every place, not only the changed ones")
+        parser.add_argument('--limit', type=int, default=SIMILAR_LIMIT, help="Similar places kept per place (rerun with --full after changing it)")
+
+    def handle(self, *args, **options):
+        stats = rebuild_similar_places(k=options['limit'], full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['changed']} of {stats['places']} places changed; "
+            f"recomputed {stats['recomputed']} lists with {stats['links']} similar places"
+        ))
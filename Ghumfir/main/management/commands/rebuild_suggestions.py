@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from main.models import SearchSuggestion
+from main.suggestions import rebuild_suggestions
+
+
+class Command(BaseCommand):
+    help = "Rebuild the \"did you mean\" trigram index from memories, places and guides"
+
+    def handle(self, *args, **options):
+        rebuild_suggestions()
+        self.stdout.write(self.style.SUCCESS(f"✅ Indexed {SearchSuggestion.objects.count()} suggestion terms"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from main.content_storage import recount_references, rehome_files
+
+
+class Command(BaseCommand):
+    help = "Move media files with flat names into content-addressed storage and recount references"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Count the files that would move without moving them')
+        parser.add_argument('--keep-originals', action='store_true', help='Leave the old files in place after copying')
+        parser.add_argument('--recount-only', action='store_true',
+                            help='Only fix reference counts and remove unreferenced files')
+
+    def handle(self, *args, **options):
+        if options['recount_only']:
+            corrected, removed = recount_references()
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Corrected {corrected} reference counts, removed {removed} unreferenced files"
+            ))
+            return
+
+        moved, missing, saved = rehome_files(dry_run=options['dry_run'], keep_originals=options['keep_originals'])
+        for name in missing:
+            self.stdout.write(self.style.ERROR(f"Missing on disk, row left as is: {name}"))
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run, nothing moved: {len(moved)} files would be rehomed"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Rehomed {len(moved)} files, {saved / 1024 / 1024:.1f} MB saved by deduplication"
+            ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from main.synthetic import EMAIL_DOMAIN, PASSWORD, clear_synthetic, seed_synthetic
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic users, places, guides, memories and place updates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--places', type=int, default=2000)
+        parser.add_argument('--guides', type=int, default=50, help='Picked from the synthetic users')
+        parser.add_argument('--memories', type=int, default=1000)
+        parser.add_argument('--media-per-memory', type=int, default=3, help='Upper bound, at least one each')
+        parser.add_argument('--place-updates', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for a repeatable data set')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true', help='Delete earlier synthetic data first')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = clear_synthetic()
+            summary = ', '.join(f"{count} {label}" for label, count in deleted.items() if count)
+            self.stdout.write(f"Deleted {summary or 'nothing'}")
+
+        created = seed_synthetic(
+            users=options['users'], places=options['places'], guides=options['guides'],
+            memories=options['memories'], media_per_memory=max(1, options['media_per_memory']),
+            place_updates=options['place_updates'], seed=options['seed'], batch_size=options['batch_size'],
+        )
+        summary = ', '.join(f"{count} {label.replace('_', ' ')}" for label, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"✅ Created {summary}"))
+        self.stdout.write(f"Synthetic users log in as user<N>@{EMAIL_DOMAIN} / {PASSWORD}")
@@ -0,0 +1,79 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .models import MemoryMedia
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+VARIANT_EXTENSION = '.webp' if VARIANT_FORMAT == 'WEBP' else '.jpg'
+VARIANT_QUALITY = 80
+
+# Resizing runs off the request path. Pillow releases the GIL while it
+# decodes and resamples, so a small thread pool keeps up with uploads.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='media-variants')
+
+
+def _render_variant(image, size):
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(media_id, force=False):
+    """Create the thumbnail and display variants for one image. Returns True if generated."""
+    media = MemoryMedia.objects.filter(pk=media_id, media_type='image').first()
+    if media is None or (media.variants_generated_at and not force):
+        return False
+
+    with media.file.open('rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        if VARIANT_FORMAT == 'JPEG' and image.mode == 'RGBA':
+            image = image.convert('RGB')
+
+        base = os.path.splitext(os.path.basename(media.file.name))[0]
+        for field, size in MemoryMedia.VARIANT_SIZES.items():
+            variant_file = getattr(media, field)
+            if variant_file:
+                variant_file.delete(save=False)
+            # Never upscale: small originals get a same-size re-encode.
+            variant_file.save(f"{base}_{field}{VARIANT_EXTENSION}", _render_variant(image, size), save=False)
+
+    media.variants_generated_at = timezone.now()
+    # update() rather than save() so nothing else on the row is rewritten
+    MemoryMedia.objects.filter(pk=media.pk).update(
+        thumbnail=media.thumbnail.name,
+        display=media.display.name,
+        variants_generated_at=media.variants_generated_at,
+    )
+    return True
+
+
+def _generate_in_worker(media_ids):
+    try:
+        for media_id in media_ids:
+            try:
+                generate_variants(media_id)
+            except Exception:
+                logger.exception("Generating variants for MemoryMedia %s failed", media_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(media_ids):
+    """Queue variant generation for after the current transaction commits."""
+    media_ids = list(media_ids)
+    if media_ids:
+        transaction.on_commit(lambda: _executor.submit(_generate_in_worker, media_ids))
@@ -0,0 +1,87 @@
+from django.db.models import Exists, OuterRef, Q
+from django.utils import dateformat
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import localtime
+
+from .models import Memory, MemoryMedia
+from .pagination import decode_cursor, encode_cursor
+
+CAPSULE_PAGE_SIZE = 24
+
+
+def capsule_queryset(q=''):
+    """Memories matching q that have at least one media file, newest first."""
+    has_media = MemoryMedia.objects.filter(memory=OuterRef('pk'))
+    return (
+        Memory.objects.filter(location_name__icontains=q)
+        .annotate(has_media=Exists(has_media))
+        .filter(has_media=True)
+        .select_related('user')
+        .prefetch_related('media')
+        .order_by('-created_at', '-id')
+    )
+
+
+def _decode_memory_cursor(cursor):
+    after = decode_cursor(cursor, [str, int])
+    if after is None:
+        return None
+    try:
+        created_at = parse_datetime(after[0])
+    except ValueError:
+        return None
+    return (created_at, after[1]) if created_at else None
+
+
+def _page_queryset(q, cursor):
+    memories = capsule_queryset(q)
+    after = _decode_memory_cursor(cursor)
+    if after:
+        created_at, memory_id = after
+        memories = memories.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=memory_id)
+        )
+    return memories
+
+
+def _split_page(memories, page_size):
+    next_cursor = None
+    if len(memories) > page_size:
+        memories = memories[:page_size]
+        last = memories[-1]
+        next_cursor = encode_cursor([last.created_at.isoformat(), last.id])
+    return memories, next_cursor
+
+
+def memory_page(q='', cursor=None, page_size=CAPSULE_PAGE_SIZE):
+    """
+    One page of capsule memories plus the cursor for the next one.
+    Costs two queries (memories + their media) regardless of the page.
+    """
+    memories = list(_page_queryset(q, cursor)[:page_size + 1])
+    return _split_page(memories, page_size)
+
+
+async def amemory_page(q='', cursor=None, page_size=CAPSULE_PAGE_SIZE):
+    """memory_page() for async views, through the async ORM."""
+    memories = [memory async for memory in _page_queryset(q, cursor)[:page_size + 1]]
+    return _split_page(memories, page_size)
+
+
+def _first(memory, attribute):
+    # media.all() is prefetched; indexing it would issue a new query
+    for media in memory.media.all():
+        return getattr(media, attribute)
+    return ''
+
+
+def serialize_memory(memory):
+    return {
+        'id': memory.id,
+        'title': memory.location_name,
+        'created_at': dateformat.format(localtime(memory.created_at), 'M d, Y'),
+        'details': f"Shared by {memory.user.first_name} {memory.user.last_name}",
+        'images': [media.display_url for media in memory.media.all()],
+        'thumbnail': _first(memory, 'thumbnail_url'),
+        'srcset': _first(memory, 'srcset'),
+    }
@@ -0,0 +1,182 @@
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.template.backends.django import Template as DjangoTemplate
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets (+Inf is implicit)
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERY_COUNT_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100]
+
+HEAVIEST_QUERIES = 3
+
+_current = ContextVar('main_request_stats', default=None)
+
+
+class RequestStats:
+    """What one request spent its time on; filled in while it runs."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.heaviest = []  # (seconds, sql), longest first
+
+    def record_query(self, sql, seconds):
+        self.query_count += 1
+        self.query_seconds += seconds
+        if len(self.heaviest) < HEAVIEST_QUERIES or seconds > self.heaviest[-1][0]:
+            self.heaviest.append((seconds, sql))
+            self.heaviest.sort(key=lambda item: -item[0])
+            del self.heaviest[HEAVIEST_QUERIES:]
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def query_timer(execute, sql, params, many, context):
+    """Execute wrapper on every connection; times the queries of the request being measured."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record_query(sql, time.perf_counter() - started)
+
+
+_templates_instrumented = False
+_instrument_lock = threading.Lock()
+
+
+def instrument_templates():
+    """
+    Time every render() of a Django template. Includes and {% extends %} run
+    inside the outer render, so each page is counted once.
+    """
+    global _templates_instrumented
+    with _instrument_lock:
+        if _templates_instrumented:
+            return
+        original = DjangoTemplate.render
+
+        def render(self, context=None, request=None):
+            stats = _current.get()
+            if stats is None:
+                return original(self, context, request)
+            started = time.perf_counter()
+            try:
+                return original(self, context, request)
+            finally:
+                stats.template_seconds += time.perf_counter() - started
+
+        DjangoTemplate.render = render
+        _templates_instrumented = True
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """Per-process request metrics, labelled by URL name."""
+
+    HISTOGRAMS = {
+        'ghumfir_request_duration_seconds': ('Total time to answer a request', DURATION_BUCKETS),
+        'ghumfir_request_db_queries': ('SQL queries run by a request', QUERY_COUNT_BUCKETS),
+        'ghumfir_request_db_duration_seconds': ('Time a request spent in SQL', DURATION_BUCKETS),
+        'ghumfir_request_template_duration_seconds': ('Time a request spent rendering templates', DURATION_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (metric, view) -> Histogram
+        self._requests = {}  # (view, method, status) -> count
+
+    def record(self, view, method, status, stats, seconds):
+        values = {
+            'ghumfir_request_duration_seconds': seconds,
+            'ghumfir_request_db_queries': stats.query_count,
+            'ghumfir_request_db_duration_seconds': stats.query_seconds,
+            'ghumfir_request_template_duration_seconds': stats.template_seconds,
+        }
+        with self._lock:
+            for metric, value in values.items():
+                key = (metric, view)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(self.HISTOGRAMS[metric][1])
+                self._histograms[key].observe(value)
+            key = (view, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            '# HELP ghumfir_requests_total Requests answered, by view, method and status',
+            '# TYPE ghumfir_requests_total counter',
+        ]
+        with self._lock:
+            for (view, method, status), count in sorted(self._requests.items()):
+                lines.append(f'ghumfir_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+
+            for metric, (help_text, buckets) in self.HISTOGRAMS.items():
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for (name, view), histogram in sorted(self._histograms.items()):
+                    if name != metric:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + ['+Inf'], histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{view="{view}"}} {histogram.total:.6f}')
+                    lines.append(f'{metric}_count{{view="{view}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def server_timing(stats, seconds):
+    return ', '.join([
+        f'db;dur={stats.query_seconds * 1000:.1f};desc="{stats.query_count} queries"',
+        f'tpl;dur={stats.template_seconds * 1000:.1f}',
+        f'total;dur={seconds * 1000:.1f}',
+    ])
+
+
+def log_if_slow(request, view, stats, seconds, threshold_ms):
+    if seconds * 1000 < threshold_ms:
+        return
+    heaviest = '\n'.join(f"  {duration * 1000:.1f} ms: {sql}" for duration, sql in stats.heaviest)
+    logger.warning(
+        "Slow request %s %s (%s) took %.0f ms: %s queries in %.0f ms, templates %.0f ms\n%s",
+        request.method, request.path, view, seconds * 1000, stats.query_count,
+        stats.query_seconds * 1000, stats.template_seconds * 1000, heaviest,
+    )
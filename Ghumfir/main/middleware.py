@@ -0,0 +1,66 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+
+def _time_queries(sender, connection, **kwargs):
+    if metrics.query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.query_timer)
+
+
+class RequestMetricsMiddleware:
+    """
+    Time each request, its SQL and its template rendering; report them in a
+    Server-Timing header, add them to the /metrics histograms (labelled by
+    URL name) and log requests slower than SLOW_REQUEST_MS.
+
+    Runs in front of sync and async views alike. Under ASGI the queries of a
+    request run on other threads than the request itself, so the timing hook
+    sits on every database connection and finds the request through a
+    context variable.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        metrics.instrument_templates()
+        connection_created.connect(_time_queries, dispatch_uid='main.middleware.time_queries')
+        for connection in connections.all(initialized_only=True):
+            _time_queries(None, connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        stats, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._record(request, response, stats)
+
+    async def _acall(self, request):
+        stats, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._record(request, response, stats)
+
+    def _record(self, request, response, stats):
+        seconds = time.perf_counter() - stats.started
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        metrics.registry.record(view, request.method, response.status_code, stats, seconds)
+        response['Server-Timing'] = metrics.server_timing(stats, seconds)
+        metrics.log_if_slow(request, view, stats, seconds, getattr(settings, 'SLOW_REQUEST_MS', 500))
+        return response
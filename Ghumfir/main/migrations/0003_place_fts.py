@@ -0,0 +1,40 @@
+from django.db import migrations
+
+FTS_COLUMNS = [
+    'name', 'region', 'destination_type', 'best_season', 'starting_point',
+    'route_overview', 'ending_point', 'transportation_access', 'lodges_hotels',
+    'food_availability', 'adventure_type', 'cultural_attractions', 'language_customs',
+    'local_community', 'not_to_miss_spots', 'photography_hotspots', 'unique_traditions',
+    'wildlife_highlights'
+]
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    columns = ', '.join(FTS_COLUMNS)
+    values = ', '.join(f"COALESCE({column}, '')" for column in FTS_COLUMNS)
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS main_place_fts USING fts5("
+        f"{columns}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO main_place_fts (rowid, {columns}) SELECT id, {values} FROM main_place"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS main_place_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_placeupdate'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _trigrams(normalized):
+    grams = set()
+    for word in normalized.split(' '):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def populate_suggestions(apps, schema_editor):
+    Memory = apps.get_model('main', 'Memory')
+    Place = apps.get_model('main', 'Place')
+    GuideProfile = apps.get_model('main', 'GuideProfile')
+    SearchSuggestion = apps.get_model('main', 'SearchSuggestion')
+    SuggestionTrigram = apps.get_model('main', 'SuggestionTrigram')
+
+    sources = {
+        'memory': list(Memory.objects.values_list('location_name', flat=True)),
+        'place': list(Place.objects.values_list('name', flat=True)),
+        'guide': list(GuideProfile.objects.values_list('primary_location', flat=True)) +
+                 list(GuideProfile.objects.values_list('secondary_location', flat=True)),
+    }
+    for kind, names in sources.items():
+        unique = {}
+        for name in names:
+            normalized = ' '.join((name or '').lower().split())[:255]
+            if normalized:
+                unique.setdefault(normalized, name.strip()[:255])
+        for normalized, term in unique.items():
+            suggestion = SearchSuggestion.objects.create(kind=kind, term=term, normalized=normalized)
+            SuggestionTrigram.objects.bulk_create(
+                SuggestionTrigram(suggestion=suggestion, trigram=gram) for gram in _trigrams(normalized)
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_place_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('memory', 'Memory Location'), ('place', 'Place'), ('guide', 'Guide Location')], max_length=10)),
+                ('term', models.CharField(max_length=255)),
+                ('normalized', models.CharField(max_length=255)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'normalized'), name='unique_suggestion_per_kind')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SuggestionTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('suggestion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='main.searchsuggestion')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'suggestion'], name='suggestion_trigram_idx')],
+            },
+        ),
+        migrations.RunPython(populate_suggestions, migrations.RunPython.noop),
+    ]
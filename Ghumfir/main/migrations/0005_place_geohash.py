@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:48
+
+from django.db import migrations, models
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def _geohash(latitude, longitude, precision=9):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def fill_geohash(apps, schema_editor):
+    Place = apps.get_model('main', 'Place')
+    places = list(Place.objects.exclude(latitude=None).exclude(longitude=None).only('latitude', 'longitude'))
+    for place in places:
+        place.geohash = _geohash(place.latitude, place.longitude)
+    Place.objects.bulk_update(places, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_search_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['latitude', 'longitude'], name='place_lat_lng_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['geohash'], name='place_geohash_idx'),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
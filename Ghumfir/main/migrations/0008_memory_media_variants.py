@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_sos_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memorymedia',
+            name='display',
+            field=models.ImageField(blank=True, null=True, upload_to='Memories/variants'),
+        ),
+        migrations.AddField(
+            model_name='memorymedia',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='Memories/variants'),
+        ),
+        migrations.AddField(
+            model_name='memorymedia',
+            name='variants_generated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:06
+
+import re
+
+from django.db import migrations, models
+
+LANGUAGE_SPLIT_RE = re.compile(r'\s*(?:[,/;&]|\band\b)\s*', re.IGNORECASE)
+
+
+def _parse_languages(text):
+    names = []
+    for part in LANGUAGE_SPLIT_RE.split(text or ''):
+        name = ' '.join(word.capitalize() for word in part.split())[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def fill_languages(apps, schema_editor):
+    GuideProfile = apps.get_model('main', 'GuideProfile')
+    Language = apps.get_model('main', 'Language')
+    for guide in GuideProfile.objects.all():
+        names = _parse_languages(guide.languages)
+        guide.spoken_languages.set([Language.objects.get_or_create(name=name)[0] for name in names])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_place_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Language',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='guideprofile',
+            name='spoken_languages',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='guides', to='main.language'),
+        ),
+        migrations.AddIndex(
+            model_name='guideprofile',
+            index=models.Index(fields=['-rating', 'id'], name='guide_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guideprofile',
+            index=models.Index(fields=['experience'], name='guide_experience_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guideprofile',
+            index=models.Index(fields=['rate_per_hour'], name='guide_rate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guideprofile',
+            index=models.Index(fields=['Licenced', 'is_verified'], name='guide_badges_idx'),
+        ),
+        migrations.RunPython(fill_languages, migrations.RunPython.noop),
+    ]
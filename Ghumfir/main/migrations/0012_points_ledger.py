@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def opening_balances(apps, schema_editor):
+    # Points earned before the ledger existed, so every balance is the sum of
+    # its events
+    CustomUser = apps.get_model('main', 'CustomUser')
+    PointsEvent = apps.get_model('main', 'PointsEvent')
+    PointsEvent.objects.bulk_create([
+        PointsEvent(user_id=user_id, amount=points, reason='opening')
+        for user_id, points in CustomUser.objects.filter(points__gt=0).values_list('id', 'points')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('main', '0011_guide_reviews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('reason', models.CharField(choices=[('opening', 'Opening Balance'), ('memory', 'Memory Shared')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-points', 'id'], name='user_points_rank_idx'),
+        ),
+        migrations.AddField(
+            model_name='pointsevent',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_events', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='pointsevent',
+            index=models.Index(fields=['user', '-created_at'], name='points_user_recent_idx'),
+        ),
+        migrations.RunPython(opening_balances, migrations.RunPython.noop),
+    ]
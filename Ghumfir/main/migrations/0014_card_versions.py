@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_stored_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guideprofile',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
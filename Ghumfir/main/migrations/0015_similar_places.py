@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_card_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='similar_text_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.CreateModel(
+            name='SimilarPlace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_links', to='main.place')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to_links', to='main.place')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('place', 'rank'), name='unique_similar_place_rank')],
+            },
+        ),
+    ]
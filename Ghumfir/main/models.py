@@ -1,10 +1,16 @@
+import hashlib
+import json
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import UniqueConstraint
+from django.db.models import F, UniqueConstraint
 from django.utils import timezone
 from django.conf import settings
 
+from .geo import geohash_encode
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -38,8 +44,32 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-points', 'id'], name='user_points_rank_idx'),
+        ]
+
     def __str__(self):
         return self.email
+
+class PointsEvent(models.Model):
+    REASON_CHOICES = [
+        ('opening', 'Opening Balance'),
+        ('memory', 'Memory Shared'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='points_events')
+    amount = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='points_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} {self.amount:+d} ({self.reason})"
     
 class EmergencyEmail(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -62,15 +92,63 @@ class MemoryMedia(models.Model):
         ('video', 'Video'),
     ]
 
+    # Longest edge in pixels of each generated variant
+    VARIANT_SIZES = {
+        'thumbnail': 400,
+        'display': 1280,
+    }
+
     memory = models.ForeignKey(Memory, on_delete=models.CASCADE, related_name='media')
     file = models.FileField(upload_to='Memories')
     media_type = models.CharField(max_length=10, choices=MEMORY_MEDIA_TYPES)
 
+    # Downscaled copies made by main.media after upload; empty until generated
+    thumbnail = models.ImageField(upload_to='Memories/variants', null=True, blank=True)
+    display = models.ImageField(upload_to='Memories/variants', null=True, blank=True)
+    variants_generated_at = models.DateTimeField(null=True, blank=True)
+
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.media_type} for {self.memory.location_name}"
+
+    @property
+    def thumbnail_url(self):
+        return self.thumbnail.url if self.thumbnail else self.file.url
+
+    @property
+    def display_url(self):
+        return self.display.url if self.display else self.file.url
+
+    @property
+    def srcset(self):
+        if not self.thumbnail:
+            return ''
+        sources = [f"{self.thumbnail.url} {self.VARIANT_SIZES['thumbnail']}w"]
+        if self.display:
+            sources.append(f"{self.display.url} {self.VARIANT_SIZES['display']}w")
+        return ', '.join(sources)
     
+class StoredFile(models.Model):
+    # One row per file main.content_storage keeps: how many FileField values
+    # point at it. The file is deleted when the last one lets go.
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
+
+class Language(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
 class GuideProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     primary_location = models.CharField(max_length=250)
@@ -90,10 +168,52 @@ class GuideProfile(models.Model):
     Licenced = models.BooleanField(default=False)
     trip_completed = models.PositiveIntegerField(default=0)
     is_verified = models.BooleanField(default=False)
+    # Running totals of GuideReview ratings; rating is their rounded average
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    # Normalized copy of the free-text languages field, kept in sync on save
+    spoken_languages = models.ManyToManyField(Language, related_name='guides', blank=True, editable=False)
+    # Goes up with every change that shows on the guide's card; the cached
+    # card fragments (main/fragment_cache.py) are keyed by it
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-rating', 'id'], name='guide_rating_idx'),
+            models.Index(fields=['experience'], name='guide_experience_idx'),
+            models.Index(fields=['rate_per_hour'], name='guide_rate_idx'),
+            models.Index(fields=['Licenced', 'is_verified'], name='guide_badges_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.version += 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.user.email
+
     
+class GuideReview(models.Model):
+    guide = models.ForeignKey(GuideProfile, on_delete=models.CASCADE, related_name='reviews')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='guide_reviews')
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['guide', 'user'], name='unique_review_per_guide'),
+        ]
+        indexes = [
+            models.Index(fields=['guide', '-created_at'], name='review_guide_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} -> {self.guide} ({self.rating})"
+
 class Place(models.Model):
     DESTINATION_TYPE_CHOICES = [
     ("cultural", "Cultural"),
@@ -159,10 +279,66 @@ class Place(models.Model):
     photography_hotspots = models.TextField(blank=True, null=True)
     unique_traditions = models.TextField(blank=True, null=True)
     wildlife_highlights = models.TextField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
+    # Fingerprint of FINGERPRINT_FIELDS; import_places skips rows whose hash is unchanged
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # Goes up with every save; the cached place card fragments are keyed by it
+    version = models.PositiveIntegerField(default=0, editable=False)
+    # Hash of the SIMILARITY_FIELDS text its SimilarPlace rows were computed from
+    similar_text_hash = models.CharField(max_length=64, blank=True, editable=False)
+
+    FINGERPRINT_FIELDS = [
+        'name', 'region', 'destination_type', 'popularity', 'best_season', 'starting_point',
+        'route_overview', 'ending_point', 'duration_days', 'altitude_m', 'difficulty',
+        'transportation_access', 'lodges_hotels', 'food_availability', 'permit_required',
+        'emergency_facilities', 'adventure_type', 'cultural_attractions', 'language_customs',
+        'latitude', 'longitude', 'local_community', 'not_to_miss_spots', 'photography_hotspots',
+        'unique_traditions', 'wildlife_highlights',
+    ]
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='place_lat_lng_idx'),
+            models.Index(fields=['geohash'], name='place_geohash_idx'),
+        ]
+
+    def compute_content_hash(self):
+        values = ['' if getattr(self, field) is None else getattr(self, field) for field in self.FINGERPRINT_FIELDS]
+        return hashlib.sha256(json.dumps(values, default=str, ensure_ascii=False).encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.geohash = geohash_encode(self.latitude, self.longitude)
+        self.content_hash = self.compute_content_hash()
+        self.version += 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = {*update_fields, 'version'}
+            if update_fields & {'latitude', 'longitude'}:
+                update_fields.add('geohash')
+            if update_fields & set(self.FINGERPRINT_FIELDS):
+                update_fields.add('content_hash')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
     
+class SimilarPlace(models.Model):
+    # The top TF-IDF neighbours of a place by its descriptive text, best
+    # first; written by the rebuild_similar_places command (main/similar.py)
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='similar_links')
+    similar = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='similar_to_links')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['place', 'rank'], name='unique_similar_place_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.place} ~ {self.similar} ({self.score:.2f})"
+
 class PlaceUpdate(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     place = models.ForeignKey(Place, on_delete=models.CASCADE)
@@ -171,3 +347,110 @@ class PlaceUpdate(models.Model):
 
     def __str__(self):
         return f"{self.place.name} - {self.user.email}: {self.update[:30]}"
+
+class SearchSuggestion(models.Model):
+    KIND_CHOICES = [
+        ('memory', 'Memory Location'),
+        ('place', 'Place'),
+        ('guide', 'Guide Location'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    term = models.CharField(max_length=255)
+    normalized = models.CharField(max_length=255)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['kind', 'normalized'], name='unique_suggestion_per_kind'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.term}"
+
+class SuggestionTrigram(models.Model):
+    suggestion = models.ForeignKey(SearchSuggestion, on_delete=models.CASCADE, related_name='trigrams')
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigram', 'suggestion'], name='suggestion_trigram_idx'),
+        ]
+
+    def __str__(self):
+        return self.trigram
+
+class OutboxEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=250)
+    body = models.TextField()
+    attachment = models.CharField(max_length=500, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+class SOSUpload(models.Model):
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sos_uploads')
+    file_path = models.CharField(max_length=500)
+    next_sequence = models.PositiveIntegerField(default=0)
+    bytes_received = models.PositiveBigIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finalized_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"SOS upload {self.token} by {self.user.email}"
+
+class CacheVersionManager(models.Manager):
+    def bump(self, *scopes):
+        now = timezone.now()
+        for scope in scopes:
+            changed = self.filter(scope=scope).update(version=F('version') + 1, changed_at=now)
+            if not changed:
+                _, created = self.get_or_create(scope=scope, defaults={'changed_at': now})
+                if not created:
+                    self.filter(scope=scope).update(version=F('version') + 1, changed_at=now)
+
+    def current(self, scopes):
+        """{scope: (version, changed_at)} in one query; scopes never bumped are left out."""
+        return {
+            scope: (version, changed_at)
+            for scope, version, changed_at in self.filter(scope__in=scopes).values_list('scope', 'version', 'changed_at')
+        }
+
+class CacheVersion(models.Model):
+    """
+    Change counter of a cached scope. Kept in the database rather than the
+    cache so every worker process sees a bump, whatever CACHE_URL is.
+    """
+    scope = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=1)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    objects = CacheVersionManager()
+
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
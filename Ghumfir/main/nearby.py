@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+
+from .models import CacheVersion, Place
+
+EARTH_RADIUS_KM = 6371.0088
+
+NEARBY_RADIUS_KM = 50
+NEARBY_LIMIT = 6
+MAX_RESULTS = 100
+
+# Bumped whenever a Place is saved or deleted so every process rebuilds its
+# coordinate arrays on the next query. A CacheVersion row, so bumps made in
+# other processes are seen too.
+VERSION_SCOPE = 'place_coordinates'
+
+_lock = threading.Lock()
+_index = None
+
+
+def invalidate():
+    CacheVersion.objects.bump(VERSION_SCOPE)
+
+
+def _current_version():
+    return CacheVersion.objects.current([VERSION_SCOPE]).get(VERSION_SCOPE, (0, None))[0]
+
+
+def _coordinates():
+    global _index
+    version = _current_version()
+    index = _index
+    if index is not None and index['version'] == version:
+        return index
+
+    with _lock:
+        if _index is not None and _index['version'] == version:
+            return _index
+        rows = list(
+            Place.objects.exclude(latitude=None).exclude(longitude=None)
+            .values_list('id', 'latitude', 'longitude')
+        )
+        coords = np.radians(np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 2))
+        _index = {
+            'version': version,
+            'ids': np.array([row[0] for row in rows], dtype=np.int64),
+            'lat': coords[:, 0],
+            'lng': coords[:, 1],
+            'cos_lat': np.cos(coords[:, 0]),
+        }
+        return _index
+
+
+def _distances_km(index, latitude, longitude):
+    lat = np.radians(latitude)
+    lng = np.radians(longitude)
+    a = (np.sin((index['lat'] - lat) / 2) ** 2
+         + np.cos(lat) * index['cos_lat'] * np.sin((index['lng'] - lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def nearby_place_ids(latitude, longitude, radius_km=None, k=None, exclude=None):
+    """
+    [(place_id, distance_km), ...] nearest first.
+
+    radius_km limits the search to a circle, k to the k closest places; either
+    or both can be given. exclude is a place id to leave out (the place itself).
+    """
+    if (radius_km is not None and not radius_km > 0) or (k is not None and k < 1):
+        return []
+    index = _coordinates()
+    if not len(index['ids']):
+        return []
+
+    distances = _distances_km(index, latitude, longitude)
+    candidates = np.arange(len(distances))
+    if exclude is not None:
+        candidates = candidates[index['ids'] != exclude]
+    if radius_km is not None:
+        candidates = candidates[distances[candidates] <= radius_km]
+
+    limit = MAX_RESULTS if k is None else min(k, MAX_RESULTS)
+    if len(candidates) > limit:
+        nearest = np.argpartition(distances[candidates], limit - 1)[:limit]
+        candidates = candidates[nearest]
+    candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+
+    return [(int(index['ids'][i]), float(distances[i])) for i in candidates]
+
+
+def nearby_places(latitude, longitude, radius_km=None, k=None, exclude=None):
+    """Place objects for nearby_place_ids, each with a distance_km attribute."""
+    matches = nearby_place_ids(latitude, longitude, radius_km, k, exclude)
+    places = Place.objects.in_bulk([place_id for place_id, _ in matches])
+    result = []
+    for place_id, distance in matches:
+        place = places.get(place_id)
+        if place is not None:
+            place.distance_km = round(distance, 1)
+            result.append(place)
+    return result
@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmergencyEmail, OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+
+# A row left in 'sending' this long belongs to a worker that died mid-batch.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+BATCH_SIZE = 50
+
+_flush_lock = threading.Lock()
+
+
+def queue_sos_alerts(user, filepath):
+    """
+    Store one outbox row per emergency contact of the user.
+    Nothing is sent here; the rows are picked up by process_outbox.
+    """
+    contacts = list(EmergencyEmail.objects.filter(user=user).values_list('emergency_email', flat=True))
+    if not contacts:
+        logger.warning("SOS from %s: no emergency email configured", user.email)
+        return []
+
+    subject = f"SOS Alert from {user.email}"
+    body = "An SOS alert has been triggered. The recorded video/audio is attached."
+    return OutboxEmail.objects.bulk_create([
+        OutboxEmail(user=user, to_email=to_email, subject=subject, body=body, attachment=filepath)
+        for to_email in contacts
+    ])
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * (2 ** max(attempts - 1, 0)), BACKOFF_MAX)
+
+
+def _claim_due(limit):
+    now = timezone.now()
+    due = OutboxEmail.objects.filter(
+        Q(status='pending', next_attempt_at__lte=now) |
+        Q(status='sending', claimed_at__lt=now - CLAIM_TIMEOUT)
+    ).order_by('next_attempt_at').values_list('pk', flat=True)[:limit]
+
+    claimed = []
+    for pk in list(due):
+        # Conditional update so two workers never send the same row.
+        updated = OutboxEmail.objects.filter(pk=pk).filter(
+            Q(status='pending') | Q(status='sending', claimed_at__lt=now - CLAIM_TIMEOUT)
+        ).update(status='sending', claimed_at=now)
+        if updated:
+            claimed.append(pk)
+    return list(OutboxEmail.objects.filter(pk__in=claimed).order_by('next_attempt_at'))
+
+
+def _build_message(row, connection):
+    message = EmailMessage(row.subject, row.body, settings.DEFAULT_FROM_EMAIL, [row.to_email],
+                           connection=connection)
+    if row.attachment and os.path.exists(row.attachment):
+        message.attach_file(row.attachment)
+    return message
+
+
+def _mark_failed(row, error):
+    row.attempts += 1
+    row.last_error = str(error)
+    row.claimed_at = None
+    if row.attempts >= MAX_ATTEMPTS:
+        row.status = 'failed'
+        logger.error("Outbox email %s to %s gave up after %s attempts: %s",
+                     row.pk, row.to_email, row.attempts, error)
+    else:
+        row.status = 'pending'
+        row.next_attempt_at = timezone.now() + backoff(row.attempts)
+        logger.warning("Outbox email %s to %s failed (attempt %s), retrying at %s: %s",
+                       row.pk, row.to_email, row.attempts, row.next_attempt_at, error)
+    row.save(update_fields=['attempts', 'last_error', 'claimed_at', 'status', 'next_attempt_at'])
+
+
+def process_outbox(limit=BATCH_SIZE):
+    """
+    Send every due outbox email over a single mail connection.
+    Returns (sent, failed) counts for this batch.
+    """
+    rows = _claim_due(limit)
+    if not rows:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for row in rows:
+            _mark_failed(row, e)
+        return 0, len(rows)
+
+    try:
+        for row in rows:
+            try:
+                _build_message(row, connection).send()
+            except Exception as e:
+                _mark_failed(row, e)
+                failed += 1
+                continue
+            row.status = 'sent'
+            row.attempts += 1
+            row.sent_at = timezone.now()
+            row.claimed_at = None
+            row.last_error = ''
+            row.save(update_fields=['status', 'attempts', 'sent_at', 'claimed_at', 'last_error'])
+            sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _flush():
+    if not _flush_lock.acquire(blocking=False):
+        return  # another thread is already draining the outbox
+    try:
+        while True:
+            sent, failed = process_outbox()
+            if not sent and not failed:
+                break
+    except Exception:
+        logger.exception("Background outbox flush failed")
+    finally:
+        _flush_lock.release()
+        close_old_connections()
+
+
+def flush_in_background():
+    """
+    Start draining the outbox on a daemon thread once the current transaction
+    commits. Anything it misses stays pending for the process_outbox command.
+    """
+    if not getattr(settings, 'OUTBOX_FLUSH_IN_BACKGROUND', True):
+        return
+    transaction.on_commit(lambda: threading.Thread(target=_flush, daemon=True).start())
@@ -0,0 +1,125 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import CacheVersion
+
+# Rendered pages are cached under keys that include the version of every
+# model scope they were built from. Saving or deleting a model bumps its scope
+# version, which orphans the old entries instead of hunting them down. The
+# versions are rows of main.CacheVersion, so a bump made by any process (a
+# web worker, a management command) reaches every other one, whichever cache
+# backend holds the pages.
+PAGE_KEY = 'main:page:{digest}'
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 60)
+
+
+def bump(*scopes):
+    CacheVersion.objects.bump(*scopes)
+
+
+def viewer_key(request):
+    # The nav bar shows the signed-in user's name, picture and points, so
+    # those are part of what the page looks like.
+    user = request.user
+    if not user.is_authenticated:
+        return 'anonymous'
+    picture = user.profile_picture.name if user.profile_picture else ''
+    return f"{user.pk}:{user.first_name}:{user.last_name}:{user.email}:{user.points}:{picture}"
+
+
+def _page_digest(request, view_name, kwargs, versions):
+    parts = [
+        view_name,
+        repr(sorted(kwargs.items())),
+        repr(sorted(request.GET.lists())),
+        viewer_key(request),
+        repr(versions),
+    ]
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def _prepare(request, view_name, scopes, kwargs):
+    """(etag, last_modified, cache key) of a cacheable request, or None to skip the cache."""
+    if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+        return None
+    current = CacheVersion.objects.current(scopes)
+    versions = [current.get(scope, (0, None))[0] for scope in scopes]
+    digest = _page_digest(request, view_name, kwargs, versions)
+    changed = [changed_at for _, changed_at in current.values()]
+    last_modified = int(max(changed).timestamp()) if changed else None
+    return f'"{digest}"', last_modified, PAGE_KEY.format(digest=digest)
+
+
+def _cached_response(request, etag, last_modified, key):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = cache.get(key)
+    return response
+
+
+def _store(key, response, timeout):
+    if response.status_code != 200 or getattr(response, 'streaming', False):
+        return False
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    cache.set(key, response, PAGE_CACHE_TIMEOUT if timeout is None else timeout)
+    return True
+
+
+def _finish(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ['Cookie'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def cached_page(*scopes, timeout=None):
+    """
+    Cache a GET view's rendered response until one of the given model scopes
+    changes, and answer conditional requests with 304 Not Modified.
+
+    The ETag covers the view, its arguments and query string, the viewer and
+    the scope versions; Last-Modified is the latest change of those scopes.
+    Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # The viewer (request.user) and the message storage may hit
+                # the database, which has to happen off the event loop
+                prepared = None if args else await sync_to_async(_prepare)(request, view.__name__, scopes, kwargs)
+                if prepared is None:
+                    return await view(request, *args, **kwargs)
+                response = await sync_to_async(_cached_response)(request, *prepared)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    if not await sync_to_async(_store)(prepared[2], response, timeout):
+                        return response
+                return _finish(response, *prepared[:2])
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            prepared = None if args else _prepare(request, view.__name__, scopes, kwargs)
+            if prepared is None:
+                return view(request, *args, **kwargs)
+            response = _cached_response(request, *prepared)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if not _store(prepared[2], response, timeout):
+                    return response
+            return _finish(response, *prepared[:2])
+        return wrapper
+    return decorator
@@ -0,0 +1,42 @@
+import base64
+import json
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe token for the sort key of the last row on a page."""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+# For a cursor value that may be an integer or a float (e.g. a bm25 score)
+NUMBER = (int, float)
+
+
+def decode_cursor(token, types):
+    """
+    Inverse of encode_cursor. types gives the type (or tuple of types) of
+    each value; a missing token, or a tampered one whose values do not
+    match them, gives None.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+    for value, kind in zip(values, types):
+        # JSON true/false load as bools, which are ints to isinstance
+        if isinstance(value, bool) or not isinstance(value, kind):
+            return None
+    return values
+
+
+def get_page_size(request, default, maximum):
+    try:
+        size = int(request.GET.get('limit', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
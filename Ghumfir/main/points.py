@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import CacheVersion, PointsEvent
+
+MEMORY_POINTS = 5
+
+LEADERBOARD_SIZE = 50
+LEADERBOARD_KEY = 'main:leaderboard'
+LEADERBOARD_LOCK_KEY = 'main:leaderboard:lock'
+# Every award and every change to a listed user bumps this CacheVersion row;
+# the cached ranking is stored with the version it was built at and rebuilt
+# once that falls behind, whichever process made the change.
+LEADERBOARD_SCOPE = 'leaderboard'
+
+
+def award_points(user, amount, reason):
+    """
+    Record a points event and move the user's balance by amount.
+
+    The balance is changed with a single UPDATE ... SET points = points + n,
+    so concurrent awards never overwrite each other and no other column of
+    the user row is written.
+    """
+    with transaction.atomic():
+        PointsEvent.objects.create(user=user, amount=amount, reason=reason)
+        user.points = F('points') + amount
+        user.save(update_fields=['points'])
+        CacheVersion.objects.bump(LEADERBOARD_SCOPE)
+        version = _version()
+    user.refresh_from_db(fields=['points'])
+    transaction.on_commit(lambda: _update_leaderboard(user, amount, version))
+    return user.points
+
+
+def _version():
+    return CacheVersion.objects.current([LEADERBOARD_SCOPE]).get(LEADERBOARD_SCOPE, (0, None))[0]
+
+
+def _entry(user):
+    return {'id': user.pk, 'name': user.first_name or 'Traveller', 'points': user.points}
+
+
+def _sort_key(entry):
+    return -entry['points'], entry['id']
+
+
+def build_leaderboard(version=None):
+    if version is None:
+        version = _version()
+    User = get_user_model()
+    users = User.objects.filter(is_active=True, points__gt=0).order_by('-points', 'id')
+    ranking = [_entry(user) for user in users.only('id', 'first_name', 'points')[:LEADERBOARD_SIZE]]
+    cache.set(LEADERBOARD_KEY, {'version': version, 'ranking': ranking}, None)
+    return ranking
+
+
+def invalidate_leaderboard():
+    CacheVersion.objects.bump(LEADERBOARD_SCOPE)
+
+
+def _update_leaderboard(user, amount, version):
+    # Fold one user's new balance into the stored ranking instead of sorting
+    # every user again. That is only right when the ranking is the one from
+    # just before this award; otherwise (another change came first, a member
+    # losing points may have to make room for someone outside it, another
+    # process holds the lock) it is left behind and the next read rebuilds it.
+    if not cache.add(LEADERBOARD_LOCK_KEY, 1, 5):
+        return
+    try:
+        stored = cache.get(LEADERBOARD_KEY)
+        if stored is None or stored['version'] != version - 1:
+            return
+        ranking = stored['ranking']
+        listed = any(entry['id'] == user.pk for entry in ranking)
+        if amount < 0 and listed:
+            return
+
+        ranking = [entry for entry in ranking if entry['id'] != user.pk]
+        entry = _entry(user)
+        if entry['points'] > 0 and (
+                len(ranking) < LEADERBOARD_SIZE or _sort_key(entry) < _sort_key(ranking[-1])):
+            ranking.append(entry)
+            ranking.sort(key=_sort_key)
+            if len(ranking) > LEADERBOARD_SIZE:
+                ranking.pop()
+        cache.set(LEADERBOARD_KEY, {'version': version, 'ranking': ranking}, None)
+    finally:
+        cache.delete(LEADERBOARD_LOCK_KEY)
+
+
+def leaderboard(limit=LEADERBOARD_SIZE):
+    stored = cache.get(LEADERBOARD_KEY)
+    version = _version()
+    if stored is None or stored['version'] != version:
+        ranking = build_leaderboard(version)
+    else:
+        ranking = stored['ranking']
+    return [dict(entry, rank=index + 1) for index, entry in enumerate(ranking[:limit])]
+
+
+def user_rank(user):
+    """1-based position of the user; a range count over user_points_rank_idx."""
+    User = get_user_model()
+    ahead = User.objects.filter(is_active=True).filter(
+        Q(points__gt=user.points) | Q(points=user.points, id__lt=user.pk)
+    ).count()
+    return ahead + 1
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast, Round
+
+from .models import GuideProfile, GuideReview
+from .page_cache import bump
+
+RECENT_REVIEWS = 5
+
+
+def _average():
+    return Case(
+        When(rating_count=0, then=Value(0)),
+        default=Round(Cast(F('rating_sum'), FloatField()) / F('rating_count'), 1),
+        output_field=DecimalField(max_digits=2, decimal_places=1),
+    )
+
+
+def _apply(guide_id, sum_delta, count_delta, trips_delta=0):
+    # Two UPDATEs so the average is computed from the new totals on every
+    # backend (MySQL evaluates SET clauses left to right, SQLite/Postgres do not).
+    guides = GuideProfile.objects.filter(pk=guide_id)
+    guides.update(
+        rating_sum=F('rating_sum') + sum_delta,
+        rating_count=F('rating_count') + count_delta,
+        trip_completed=F('trip_completed') + trips_delta,
+        version=F('version') + 1,
+    )
+    guides.update(rating=_average())
+    # Callers hold a transaction open; bumping before it commits would let a
+    # concurrent request cache the old ratings under the new version
+    transaction.on_commit(lambda: bump('guide'))
+
+
+def submit_review(guide, user, rating, comment=''):
+    """
+    Create the user's review of the guide, or replace their earlier one, and
+    move the guide's rating totals by the difference. A new review also counts
+    as a completed trip.
+    """
+    with transaction.atomic():
+        review = GuideReview.objects.select_for_update().filter(guide=guide, user=user).first()
+        if review is None:
+            review = GuideReview.objects.create(guide=guide, user=user, rating=rating, comment=comment)
+            _apply(guide.pk, rating, 1, trips_delta=1)
+        else:
+            previous = review.rating
+            review.rating = rating
+            review.comment = comment
+            review.save(update_fields=['rating', 'comment', 'updated_at'])
+            if rating != previous:
+                _apply(guide.pk, rating - previous, 0)
+    return review
+
+
+def delete_review(review):
+    with transaction.atomic():
+        deleted, _ = GuideReview.objects.filter(pk=review.pk).delete()
+        if deleted:
+            _apply(review.guide_id, -review.rating, -1)
+
+
+def rebuild_guide_ratings():
+    """
+    Recompute the rating totals from the reviews, for guides whose totals have
+    drifted (reviews edited in the admin, manual SQL). Returns how many changed.
+    """
+    totals = {
+        row['guide']: (row['total'], row['count'])
+        for row in GuideReview.objects.values('guide').annotate(total=Sum('rating'), count=Count('id'))
+    }
+    changed = []
+    for guide in GuideProfile.objects.only('id', 'rating_sum', 'rating_count'):
+        total, count = totals.get(guide.pk, (0, 0))
+        if (guide.rating_sum, guide.rating_count) != (total, count):
+            guide.rating_sum, guide.rating_count = total, count
+            changed.append(guide)
+
+    with transaction.atomic():
+        GuideProfile.objects.bulk_update(changed, ['rating_sum', 'rating_count'], batch_size=500)
+        GuideProfile.objects.filter(pk__in=[guide.pk for guide in changed]).update(
+            rating=_average(), version=F('version') + 1,
+        )
+        transaction.on_commit(lambda: bump('guide'))
+    return len(changed)
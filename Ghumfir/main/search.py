@@ -0,0 +1,253 @@
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Place
+from .pagination import NUMBER, decode_cursor, encode_cursor
+
+# Text fields of Place that take part in keyword search (order matters: it is
+# the column order of the FTS table).
+PLACE_SEARCH_FIELDS = [
+    'name', 'region', 'destination_type', 'best_season', 'starting_point',
+    'route_overview', 'ending_point', 'transportation_access', 'lodges_hotels',
+    'food_availability', 'adventure_type', 'cultural_attractions', 'language_customs',
+    'local_community', 'not_to_miss_spots', 'photography_hotspots', 'unique_traditions',
+    'wildlife_highlights'
+]
+
+PLACE_FTS_TABLE = 'main_place_fts'
+
+# Relevance weight per field: a hit in the name counts far more than a hit in
+# the list of lodges. Fields not listed here weigh 1.
+PLACE_FIELD_WEIGHTS = {
+    'name': 10,
+    'region': 5,
+    'destination_type': 3,
+    'adventure_type': 3,
+    'starting_point': 2,
+    'ending_point': 2,
+    'cultural_attractions': 2,
+    'not_to_miss_spots': 2,
+    'wildlife_highlights': 2,
+    'transportation_access': 0.5,
+    'lodges_hotels': 0.5,
+    'food_availability': 0.5,
+}
+
+PLACE_RESULT_FIELDS = ['id', 'name', 'region', 'latitude', 'longitude']
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_RESULT_CAP = 200
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled(conn=connection):
+    """The FTS5 index only exists on SQLite; other backends use the LIKE fallback."""
+    return conn.vendor == 'sqlite'
+
+
+def rebuild_place_index(conn=connection):
+    """Re-populate the whole index from main_place in a single statement."""
+    if not fts_enabled(conn):
+        return
+    columns = ', '.join(PLACE_SEARCH_FIELDS)
+    values = ', '.join(f"COALESCE({field}, '')" for field in PLACE_SEARCH_FIELDS)
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {PLACE_FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {PLACE_FTS_TABLE} (rowid, {columns}) "
+            f"SELECT id, {values} FROM {Place._meta.db_table}"
+        )
+
+
+def reindex_places(names, batch_size=500):
+    """Refresh the index rows of the named places only (after bulk writes)."""
+    if not fts_enabled():
+        return
+    names = list(names)
+    columns = ', '.join(PLACE_SEARCH_FIELDS)
+    values = ', '.join(f"COALESCE({field}, '')" for field in PLACE_SEARCH_FIELDS)
+    with connection.cursor() as cursor:
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            ids = f"SELECT id FROM {Place._meta.db_table} WHERE name IN ({placeholders})"
+            cursor.execute(f"DELETE FROM {PLACE_FTS_TABLE} WHERE rowid IN ({ids})", batch)
+            cursor.execute(
+                f"INSERT INTO {PLACE_FTS_TABLE} (rowid, {columns}) "
+                f"SELECT id, {values} FROM {Place._meta.db_table} WHERE name IN ({placeholders})",
+                batch,
+            )
+
+
+def index_place(place):
+    if not fts_enabled():
+        return
+    columns = ', '.join(PLACE_SEARCH_FIELDS)
+    placeholders = ', '.join(['%s'] * (len(PLACE_SEARCH_FIELDS) + 1))
+    values = [place.pk] + [str(getattr(place, field) or '') for field in PLACE_SEARCH_FIELDS]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {PLACE_FTS_TABLE} WHERE rowid = %s", [place.pk])
+        cursor.execute(
+            f"INSERT INTO {PLACE_FTS_TABLE} (rowid, {columns}) VALUES ({placeholders})",
+            values,
+        )
+
+
+def unindex_place(pk):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {PLACE_FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+def build_match_query(keywords):
+    """
+    Turn the user's keywords into an FTS5 MATCH expression.
+    Tokens inside one keyword must all match (prefix search), keywords are OR'ed
+    together - the same semantics the old icontains chain had.
+    """
+    clauses = []
+    for keyword in keywords:
+        tokens = TOKEN_RE.findall(keyword or '')
+        if tokens:
+            clauses.append('(' + ' AND '.join(f'"{token}"*' for token in tokens) + ')')
+    return ' OR '.join(clauses)
+
+
+def _like_filter(keywords):
+    combined_query = Q()
+    for keyword in keywords:
+        q_obj = Q()
+        for field in PLACE_SEARCH_FIELDS:
+            q_obj |= Q(**{f"{field}__icontains": keyword})
+        combined_query |= q_obj
+    return combined_query
+
+
+def search_places(keywords, queryset=None):
+    """
+    Return the places matching any of the given keywords.
+    No keywords means no filtering, like before.
+    """
+    if queryset is None:
+        queryset = Place.objects.all()
+    keywords = [k for k in keywords if k]
+    if not keywords:
+        return queryset
+
+    if not fts_enabled():
+        return queryset.filter(_like_filter(keywords)).distinct()
+
+    match = build_match_query(keywords)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f"SELECT rowid FROM {PLACE_FTS_TABLE} WHERE {PLACE_FTS_TABLE} MATCH %s", [match]
+    ))
+
+
+def _page(rows, page_size, cursor_key, served):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    served += len(rows)
+    next_cursor = None
+    if rows and has_more:
+        next_cursor = encode_cursor(cursor_key(rows[-1]) + [served])
+    return rows, next_cursor
+
+
+def _fts_page(keywords, after, page_size):
+    weights = ', '.join(str(PLACE_FIELD_WEIGHTS.get(field, 1)) for field in PLACE_SEARCH_FIELDS)
+    columns = ', '.join(f"p.{field}" for field in PLACE_RESULT_FIELDS)
+    params = [build_match_query(keywords), SEARCH_RESULT_CAP]
+    keyset = ''
+    if after:
+        keyset = "WHERE hits.score > %s OR (hits.score = %s AND hits.id > %s)"
+        params += [after[0], after[0], after[1]]
+    params.append(page_size + 1)
+
+    # bm25() is "lower is better", so ascending score puts the best hit first.
+    sql = (
+        f"SELECT {columns}, hits.score FROM ("
+        f"  SELECT rowid AS id, bm25({PLACE_FTS_TABLE}, {weights}) AS score"
+        f"  FROM {PLACE_FTS_TABLE} WHERE {PLACE_FTS_TABLE} MATCH %s"
+        f"  ORDER BY score, rowid LIMIT %s"
+        f") hits JOIN {Place._meta.db_table} p ON p.id = hits.id "
+        f"{keyset} ORDER BY hits.score, hits.id LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = [
+            dict(zip(PLACE_RESULT_FIELDS + ['score'], row))
+            for row in cursor.fetchall()
+        ]
+    return rows, lambda row: [row['score'], row['id']]
+
+
+def _like_page(keywords, after, page_size):
+    # Without FTS5, score each place by the summed weight of the fields that
+    # contain a keyword, highest first.
+    score = Value(0, output_field=IntegerField())
+    for keyword in keywords:
+        for field in PLACE_SEARCH_FIELDS:
+            weight = int(PLACE_FIELD_WEIGHTS.get(field, 1) * 2)
+            score = score + Case(
+                When(**{f"{field}__icontains": keyword}, then=Value(weight)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+
+    places = Place.objects.filter(_like_filter(keywords)).annotate(score=score)
+    if after:
+        places = places.filter(Q(score__lt=after[0]) | Q(score=after[0], id__gt=after[1]))
+    rows = list(places.order_by('-score', 'id').values(*PLACE_RESULT_FIELDS, 'score')[:page_size + 1])
+    return rows, lambda row: [row['score'], row['id']]
+
+
+def _browse_page(after, page_size):
+    places = Place.objects.order_by('id')
+    if after:
+        places = places.filter(id__gt=after[0])
+    rows = list(places.values(*PLACE_RESULT_FIELDS)[:page_size + 1])
+    return rows, lambda row: [row['id']]
+
+
+def search_places_page(keywords, cursor=None, page_size=SEARCH_PAGE_SIZE):
+    """
+    One page of places for the given keywords, best match first.
+
+    Returns (rows, next_cursor) where rows are dicts of PLACE_RESULT_FIELDS and
+    next_cursor is None on the last page. Searches stop after SEARCH_RESULT_CAP
+    results; browsing without keywords pages through every place by id.
+    """
+    keywords = [k for k in keywords if k]
+    # The sort key of the last row served, then how many rows were served
+    after = decode_cursor(cursor, [NUMBER, int, int] if keywords else [int, int])
+    if after is None:
+        served = 0
+    else:
+        served = max(after.pop(), 0)
+
+    if not keywords:
+        rows, cursor_key = _browse_page(after, page_size)
+        return _page(rows, page_size, cursor_key, served)
+
+    remaining = SEARCH_RESULT_CAP - served
+    if remaining <= 0:
+        return [], None
+    page_size = min(page_size, remaining)
+
+    if fts_enabled():
+        if not build_match_query(keywords):
+            return [], None
+        rows, cursor_key = _fts_page(keywords, after, page_size)
+    else:
+        rows, cursor_key = _like_page(keywords, after, page_size)
+    rows, next_cursor = _page(rows, page_size, cursor_key, served)
+    if served + len(rows) >= SEARCH_RESULT_CAP:
+        next_cursor = None
+    return rows, next_cursor
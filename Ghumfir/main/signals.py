@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import GuideProfile, Memory, MemoryMedia, Place
+from . import nearby, page_cache, points, search, suggestions
+from .content_storage import release
+from .guides import sync_guide_languages
+
+BATCH_SIZE = 500
+
+# The fields each model feeds into the search suggestions, by kind
+SUGGESTION_FIELDS = {
+    Place: ('place', ['name']),
+    Memory: ('memory', ['location_name']),
+    GuideProfile: ('guide', ['primary_location', 'secondary_location']),
+}
+
+
+@receiver(pre_save, sender=Place)
+@receiver(pre_save, sender=Memory)
+@receiver(pre_save, sender=GuideProfile)
+def remember_suggestion_terms(sender, instance, update_fields=None, **kwargs):
+    # The stored terms, so the post_save handlers can drop a renamed one
+    _, fields = SUGGESTION_FIELDS[sender]
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    instance._previous_terms = {}
+    if instance.pk is not None and fields:
+        instance._previous_terms = sender._default_manager.filter(pk=instance.pk).values(*fields).first() or {}
+
+
+def _drop_renamed_terms(sender, instance):
+    kind, _ = SUGGESTION_FIELDS[sender]
+    for field, term in instance.__dict__.pop('_previous_terms', {}).items():
+        if term and suggestions.normalize(term) != suggestions.normalize(getattr(instance, field)):
+            suggestions.remove_term_if_unused(kind, term)
+
+
+@receiver(post_save, sender=Place)
+def place_saved(sender, instance, **kwargs):
+    search.index_place(instance)
+    suggestions.add_term('place', instance.name)
+    _drop_renamed_terms(sender, instance)
+    nearby.invalidate()
+    page_cache.bump('place')
+
+
+@receiver(pre_delete, sender=Place)
+def place_deleting(sender, instance, **kwargs):
+    # Similar-place lists holding this place come up one short once it is
+    # gone; forgetting their text hash has the next rebuild refill them
+    Place.objects.filter(similar_links__similar=instance).update(similar_text_hash='')
+
+
+@receiver(post_delete, sender=Place)
+def place_deleted(sender, instance, **kwargs):
+    search.unindex_place(instance.pk)
+    suggestions.remove_term_if_unused('place', instance.name)
+    nearby.invalidate()
+    page_cache.bump('place')
+
+
+@receiver(post_save, sender=Memory)
+def memory_saved(sender, instance, **kwargs):
+    suggestions.add_term('memory', instance.location_name)
+    _drop_renamed_terms(sender, instance)
+
+
+@receiver(post_delete, sender=Memory)
+def memory_deleted(sender, instance, **kwargs):
+    suggestions.remove_term_if_unused('memory', instance.location_name)
+
+
+@receiver(post_delete, sender=MemoryMedia)
+def memory_media_deleted(sender, instance, **kwargs):
+    for file in (instance.file, instance.thumbnail, instance.display):
+        release(file)
+
+
+@receiver(post_save, sender=GuideProfile)
+def guide_saved(sender, instance, **kwargs):
+    sync_guide_languages(instance)
+    suggestions.add_term('guide', instance.primary_location)
+    if instance.secondary_location:
+        suggestions.add_term('guide', instance.secondary_location)
+    _drop_renamed_terms(sender, instance)
+    page_cache.bump('guide')
+
+
+@receiver(post_delete, sender=GuideProfile)
+def guide_deleted(sender, instance, **kwargs):
+    suggestions.remove_term_if_unused('guide', instance.primary_location)
+    if instance.secondary_location:
+        suggestions.remove_term_if_unused('guide', instance.secondary_location)
+    page_cache.bump('guide')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Logins and points awards (which keep the leaderboard up to date
+    # themselves) change nothing on guide cards
+    if update_fields and set(update_fields) <= {'last_login', 'points'}:
+        return
+    if update_fields is None:
+        # A full save (admin, profile form) may have changed the name or points
+        points.invalidate_leaderboard()
+    # The guide card shows the user's name and picture
+    if GuideProfile.objects.filter(user=instance).update(version=F('version') + 1):
+        page_cache.bump('guide')
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    release(instance.profile_picture)
+
+
+def places_bulk_changed(names):
+    """
+    Bring the derived place indexes up to date after bulk writes, which skip
+    the per-row signals above. names are the place names that were written.
+    """
+    names = list(names)
+    if not names:
+        return
+    for start in range(0, len(names), BATCH_SIZE):
+        Place.objects.filter(name__in=names[start:start + BATCH_SIZE]).update(version=F('version') + 1)
+    search.reindex_places(names)
+    suggestions.add_terms('place', names)
+    nearby.invalidate()
+    page_cache.bump('place')
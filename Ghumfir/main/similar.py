@@ -0,0 +1,188 @@
+import hashlib
+import re
+from collections import Counter
+
+import numpy as np
+from django.db import transaction
+from scipy import sparse
+
+from .models import Place, SimilarPlace
+from .page_cache import bump
+
+SIMILAR_LIMIT = 4
+BATCH_SIZE = 500
+
+# The descriptive text two places are compared on. Name and region are left
+# out: geography is what the nearby list is for.
+SIMILARITY_FIELDS = [
+    'destination_type', 'difficulty', 'adventure_type', 'route_overview', 'cultural_attractions',
+    'wildlife_highlights', 'not_to_miss_spots', 'unique_traditions', 'local_community',
+    'photography_hotspots', 'best_season',
+]
+
+TOKEN = re.compile(r'[a-z]{3,}')
+STOP_WORDS = frozenset("""
+    about after also and are around been but can during each for from has have into its
+    more most not off one only other over some such than that the their there these this
+    through very was were which while with you your
+""".split())
+
+
+def similarity_text(values):
+    return '\n'.join(str(value) for value in values if value)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def tokenize(text):
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def tfidf_matrix(texts):
+    """
+    CSR matrix with one L2-normalised TF-IDF row per text: sublinear term
+    frequency (1 + log tf) and smoothed inverse document frequency, so the
+    dot product of two rows is their cosine similarity.
+    """
+    vocabulary = {}
+    indptr, indices, counts = [0], [], []
+    for text in texts:
+        for token, count in Counter(tokenize(text)).items():
+            indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            counts.append(count)
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.array(counts, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+        shape=(len(texts), len(vocabulary)),
+    )
+    documents = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(texts)) / (1 + documents)) + 1
+    matrix.data = (1 + np.log(matrix.data)) * idf[matrix.indices]
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+    return matrix
+
+
+def top_neighbours(matrix, rows, k, batch_size=BATCH_SIZE):
+    """
+    The k most similar other rows for each of rows, best first, as two
+    len(rows) x k arrays (row indices, scores). Similarities are computed
+    batch_size rows at a time against the whole matrix; slots left without
+    a neighbour sharing any term hold -1.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    k = min(k, matrix.shape[0] - 1)
+    neighbours = np.full((len(rows), max(k, 0)), -1, dtype=np.int64)
+    scores = np.zeros((len(rows), max(k, 0)))
+    if k <= 0:
+        return neighbours, scores
+
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        similarity = (matrix[batch] @ transposed).toarray()
+        similarity[np.arange(len(batch)), batch] = 0
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        top[top_scores <= 0] = -1
+        neighbours[start:start + len(batch)] = top
+        scores[start:start + len(batch)] = top_scores
+    return neighbours, scores
+
+
+def _best_match(matrix, rows, batch_size=BATCH_SIZE):
+    """Highest similarity of every row of the matrix to any of rows (other than itself)."""
+    best = np.zeros(matrix.shape[0])
+    if not len(rows):
+        return best
+    targets = matrix[rows].T.tocsr()
+    for start in range(0, matrix.shape[0], batch_size):
+        similarity = (matrix[start:start + batch_size] @ targets).toarray()
+        own = (rows >= start) & (rows < start + batch_size)
+        similarity[rows[own] - start, np.flatnonzero(own)] = 0
+        best[start:start + batch_size] = similarity.max(axis=1)
+    return best
+
+
+def rebuild_similar_places(k=SIMILAR_LIMIT, full=False, batch_size=BATCH_SIZE):
+    """
+    Bring the SimilarPlace table up to date. Only the lists that can have
+    changed are recomputed: those of places whose text changed since the
+    last run (or that lost a neighbour, see signals.place_deleting), of
+    places listing one of them and of places one of them now beats the
+    last entry of. Lists left alone keep the scores of the run that computed
+    them, with that run's IDF weights; full=True recomputes every list.
+
+    Returns a stats dict: places, changed, recomputed, links.
+    """
+    rows = list(Place.objects.order_by('pk').values_list('pk', 'similar_text_hash', *SIMILARITY_FIELDS))
+    ids = [row[0] for row in rows]
+    texts = [similarity_text(row[2:]) for row in rows]
+    hashes = [text_hash(text) for text in texts]
+    changed = np.array([index for index, row in enumerate(rows) if full or row[1] != hashes[index]], dtype=np.int64)
+    stats = {'places': len(rows), 'changed': len(changed), 'recomputed': 0, 'links': 0}
+    if not len(changed):
+        return stats
+
+    k = min(k, max(len(rows) - 1, 0))
+    matrix = tfidf_matrix(texts)
+    affected = np.zeros(len(rows), dtype=bool)
+    affected[changed] = True
+    if not affected.all():
+        position = {place_id: index for index, place_id in enumerate(ids)}
+        stored = {}  # row index -> scores of its stored neighbours
+        changed_ids = {ids[index] for index in changed.tolist()}
+        for place_id, similar_id, score in SimilarPlace.objects.values_list('place_id', 'similar_id', 'score'):
+            index = position[place_id]
+            stored.setdefault(index, []).append(score)
+            if similar_id in changed_ids:
+                affected[index] = True
+        # A changed place gets onto a list by beating its last entry, or by
+        # filling a free slot
+        last_score = np.zeros(len(rows))
+        for index, scores in stored.items():
+            if len(scores) >= k:
+                last_score[index] = min(scores)
+        affected |= _best_match(matrix, changed, batch_size) > last_score
+    recompute = np.flatnonzero(affected)
+    neighbours, scores = top_neighbours(matrix, recompute, k, batch_size)
+
+    links = [
+        SimilarPlace(place_id=ids[index], similar_id=ids[neighbour], rank=rank, score=score)
+        for index, row_neighbours, row_scores in zip(recompute.tolist(), neighbours.tolist(), scores.tolist())
+        for rank, (neighbour, score) in enumerate(
+            (neighbour, score) for neighbour, score in zip(row_neighbours, row_scores) if neighbour >= 0
+        )
+    ]
+    recompute_ids = [ids[index] for index in recompute.tolist()]
+    with transaction.atomic():
+        for start in range(0, len(recompute_ids), batch_size):
+            SimilarPlace.objects.filter(place_id__in=recompute_ids[start:start + batch_size]).delete()
+        SimilarPlace.objects.bulk_create(links, batch_size=batch_size)
+        Place.objects.bulk_update(
+            [Place(pk=ids[index], similar_text_hash=hashes[index]) for index in changed.tolist()],
+            ['similar_text_hash'], batch_size=batch_size,
+        )
+        # After commit, or a page rendered from the old rows could be cached
+        # under the new version
+        transaction.on_commit(lambda: bump('place'))
+
+    stats.update(recomputed=len(recompute_ids), links=len(links))
+    return stats
+
+
+def similar_places(place_id):
+    """The stored neighbours of a place, best first, with just what a place card shows."""
+    return (
+        Place.objects.filter(similar_to_links__place_id=place_id)
+        .order_by('similar_to_links__rank')
+        .only('id', 'name', 'region', 'destination_type', 'version')
+    )
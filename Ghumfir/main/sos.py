@@ -0,0 +1,121 @@
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SOSUpload
+from .outbox import flush_in_background, queue_sos_alerts
+
+MAX_CHUNK_SIZE = 5 * 1024 * 1024
+READ_SIZE = 64 * 1024
+
+# An upload nobody finalized (phone died, network gone) still alerts the
+# contacts once it has been idle this long.
+STALE_AFTER = timedelta(minutes=2)
+
+
+class ChunkOutOfOrder(Exception):
+    def __init__(self, upload):
+        super().__init__("Chunk does not continue the upload")
+        self.upload = upload
+
+
+def upload_state(upload):
+    return {
+        "upload_id": str(upload.token),
+        "next_sequence": upload.next_sequence,
+        "offset": upload.bytes_received,
+        "finalized": upload.finalized_at is not None,
+    }
+
+
+def save_video(user, video_file):
+    """Write a one-shot SOS recording to sos_videos/ and return its path."""
+    folder = os.path.join(settings.MEDIA_ROOT, "sos_videos")
+    os.makedirs(folder, exist_ok=True)
+
+    filename = f"sos_{user.id if user else 'unknown'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.webm"
+    filepath = os.path.join(folder, filename)
+
+    with open(filepath, "wb+") as dest:
+        for chunk in video_file.chunks():
+            dest.write(chunk)
+    return filepath
+
+
+def alert_contacts(user, filepath):
+    # Alerts go through the outbox so the upload returns as soon as the
+    # video is on disk; delivery and retries happen in the background.
+    with transaction.atomic():
+        queue_sos_alerts(user, filepath)
+        flush_in_background()
+
+
+def start_upload(user):
+    folder = os.path.join(settings.MEDIA_ROOT, "sos_videos")
+    os.makedirs(folder, exist_ok=True)
+
+    filename = f"sos_{user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.webm"
+    filepath = os.path.join(folder, filename)
+    open(filepath, "wb").close()
+
+    return SOSUpload.objects.create(user=user, file_path=filepath)
+
+
+def append_chunk(upload, sequence, offset, stream, length):
+    """
+    Append one MediaRecorder chunk to the upload's file.
+
+    A chunk the server already has (a client retry after a lost response) is
+    acknowledged without writing it twice. Anything else that does not start
+    exactly at the current sequence/offset raises ChunkOutOfOrder so the
+    client can resume from upload_state().
+    """
+    with transaction.atomic():
+        upload = SOSUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.finalized_at is not None:
+            raise ChunkOutOfOrder(upload)
+        if sequence < upload.next_sequence and offset + length <= upload.bytes_received:
+            return upload
+        if sequence != upload.next_sequence or offset != upload.bytes_received:
+            raise ChunkOutOfOrder(upload)
+
+        written = 0
+        with open(upload.file_path, "r+b") as dest:
+            # Drop any tail left by a write that never got acknowledged
+            dest.seek(upload.bytes_received)
+            dest.truncate()
+            while written < length:
+                data = stream.read(min(READ_SIZE, length - written))
+                if not data:
+                    break
+                dest.write(data)
+                written += len(data)
+
+        if written != length:
+            raise ChunkOutOfOrder(upload)
+
+        upload.next_sequence += 1
+        upload.bytes_received += written
+        upload.save(update_fields=["next_sequence", "bytes_received", "updated_at"])
+    return upload
+
+
+def finalize_upload(upload):
+    """Close the upload and queue the SOS alerts. Safe to call twice."""
+    with transaction.atomic():
+        updated = SOSUpload.objects.filter(pk=upload.pk, finalized_at=None).update(finalized_at=timezone.now())
+        if updated:
+            alert_contacts(upload.user, upload.file_path)
+    upload.refresh_from_db()
+    return upload
+
+
+def finalize_stale_uploads():
+    stale = SOSUpload.objects.filter(finalized_at=None, updated_at__lt=timezone.now() - STALE_AFTER)
+    uploads = list(stale.select_related("user"))
+    for upload in uploads:
+        finalize_upload(upload)
+    return len(uploads)
@@ -0,0 +1,77 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, features
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+WEBP_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+WEBP_QUALITY = 80
+
+
+class StaticAssetStorage(CompressedManifestStaticFilesStorage):
+    """
+    collectstatic builds the production static tree: every file gets a
+    content hash in its name, WebP copies are made of large PNG/JPEG images,
+    and the hashed files are written gzip- and (with the brotli package)
+    brotli-compressed next to the originals. WhiteNoiseMiddleware then serves
+    them with far-future immutable headers and picks the precompressed
+    variant from Accept-Encoding, so requests do no compression work.
+
+    Templates keep asking for the PNG/JPEG; when its WebP is smaller the
+    manifest points the original name at the WebP file.
+    """
+
+    def stored_name(self, name):
+        # Before collectstatic has produced a manifest (a fresh checkout, the
+        # test runner) serve files under their source names.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run=dry_run, **options)
+            return
+
+        paths = dict(paths)
+        webp_copies = {}
+        for name in list(paths):
+            webp_name = self._write_webp(name, paths)
+            if webp_name:
+                paths[webp_name] = (self, webp_name)
+                webp_copies[name] = webp_name
+
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+        if webp_copies:
+            for name, webp_name in webp_copies.items():
+                self.hashed_files[self.hash_key(name)] = self.hashed_files[self.hash_key(webp_name)]
+            self.save_manifest()
+
+    def _write_webp(self, name, paths):
+        """Save a smaller WebP copy of a large raster image; returns its name."""
+        if not name.lower().endswith(WEBP_EXTENSIONS) or not features.check('webp'):
+            return None
+        webp_name = os.path.splitext(name)[0] + '.webp'
+        if webp_name in paths:  # a hand-made WebP of the same name wins
+            return None
+        size = self.size(name)
+        if size < settings.STATIC_WEBP_MIN_BYTES:
+            return None
+
+        with self.open(name) as source:
+            image = Image.open(source)
+            image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        buffer = BytesIO()
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+        if buffer.tell() >= size:
+            return None
+
+        if self.exists(webp_name):
+            self.delete(webp_name)
+        self._save(webp_name, ContentFile(buffer.getvalue()))
+        return webp_name
@@ -0,0 +1,136 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from fuzzywuzzy import process
+
+from .models import GuideProfile, Memory, Place, SearchSuggestion, SuggestionTrigram
+
+# Trigram overlap picks the candidates, fuzzywuzzy only re-scores these few.
+CANDIDATE_LIMIT = 20
+SCORE_CUTOFF = 70
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize(term):
+    return WHITESPACE_RE.sub(' ', (term or '').strip().lower())
+
+
+def trigrams(term):
+    """Distinct trigrams of each word, padded like pg_trgm ('  ab ', ...)."""
+    grams = set()
+    for word in normalize(term).split(' '):
+        if not word:
+            continue
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def add_term(kind, term):
+    normalized = normalize(term)
+    if not normalized:
+        return
+    with transaction.atomic():
+        suggestion, created = SearchSuggestion.objects.get_or_create(
+            kind=kind, normalized=normalized[:255], defaults={'term': term.strip()[:255]}
+        )
+        if created:
+            SuggestionTrigram.objects.bulk_create(
+                SuggestionTrigram(suggestion=suggestion, trigram=gram) for gram in trigrams(normalized)
+            )
+
+
+def _insert_trigrams(suggestions):
+    # Raw executemany: building a model instance per trigram dominates bulk loads
+    rows = [(suggestion.pk, gram) for suggestion in suggestions for gram in trigrams(suggestion.normalized)]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {SuggestionTrigram._meta.db_table} (suggestion_id, trigram) VALUES (%s, %s)", rows
+        )
+
+
+def _unique_terms(terms):
+    unique = {}
+    for term in terms:
+        normalized = normalize(term)
+        if normalized:
+            unique.setdefault(normalized[:255], term.strip()[:255])
+    return unique
+
+
+def add_terms(kind, terms):
+    """Bulk add_term for imports: inserts only the terms not indexed yet."""
+    unique = _unique_terms(terms)
+    with transaction.atomic():
+        existing = set(SearchSuggestion.objects.filter(kind=kind).values_list('normalized', flat=True))
+        suggestions = SearchSuggestion.objects.bulk_create(
+            [SearchSuggestion(kind=kind, term=term, normalized=normalized)
+             for normalized, term in unique.items() if normalized not in existing],
+            batch_size=1000,
+        )
+        _insert_trigrams(suggestions)
+
+
+def _term_in_use(kind, normalized):
+    # Match any spelling that normalizes to the same term (case, extra spaces).
+    pattern = r'^\s*' + r'\s+'.join(re.escape(word) for word in normalized.split(' ')) + r'\s*$'
+    if kind == 'memory':
+        return Memory.objects.filter(location_name__iregex=pattern).exists()
+    if kind == 'place':
+        return Place.objects.filter(name__iregex=pattern).exists()
+    return GuideProfile.objects.filter(
+        Q(primary_location__iregex=pattern) | Q(secondary_location__iregex=pattern)
+    ).exists()
+
+
+def remove_term_if_unused(kind, term):
+    """Drop a suggestion once the last row carrying that name is gone."""
+    normalized = normalize(term)
+    if not normalized or _term_in_use(kind, normalized):
+        return
+    SearchSuggestion.objects.filter(kind=kind, normalized=normalized[:255]).delete()
+
+
+def suggest(kind, query):
+    """Closest known term for a search that found nothing, or None."""
+    grams = trigrams(query)
+    if not grams:
+        return None
+
+    candidate_ids = (
+        SuggestionTrigram.objects.filter(trigram__in=grams, suggestion__kind=kind)
+        .values('suggestion')
+        .annotate(hits=Count('id'))
+        .order_by('-hits')
+        .values_list('suggestion', flat=True)[:CANDIDATE_LIMIT]
+    )
+    terms = list(SearchSuggestion.objects.filter(id__in=list(candidate_ids)).values_list('term', flat=True))
+    if not terms:
+        return None
+
+    result = process.extractOne(query, terms, score_cutoff=SCORE_CUTOFF)
+    return result[0] if result else None
+
+
+def rebuild_suggestions(kinds=None):
+    sources = {
+        'memory': Memory.objects.values_list('location_name', flat=True),
+        'place': Place.objects.values_list('name', flat=True),
+        'guide': list(GuideProfile.objects.values_list('primary_location', flat=True)) +
+                 list(GuideProfile.objects.exclude(secondary_location=None).values_list('secondary_location', flat=True)),
+    }
+
+    if kinds is not None:
+        sources = {kind: names for kind, names in sources.items() if kind in kinds}
+
+    with transaction.atomic():
+        SearchSuggestion.objects.filter(kind__in=list(sources)).delete()
+        for kind, names in sources.items():
+            suggestions = SearchSuggestion.objects.bulk_create(
+                [SearchSuggestion(kind=kind, term=term, normalized=normalized)
+                 for normalized, term in _unique_terms(names).items()],
+                batch_size=1000,
+            )
+            _insert_trigrams(suggestions)
@@ -0,0 +1,245 @@
+import io
+import os
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from . import page_cache, suggestions
+from .geo import geohash_encode
+from .guides import parse_languages
+from .models import GuideProfile, Language, Memory, MemoryMedia, Place, PlaceUpdate
+from .points import invalidate_leaderboard
+from .signals import places_bulk_changed
+
+# Every generated user has an address on this domain, which is how
+# clear_synthetic finds them (everything else hangs off the users or is a
+# place named with PLACE_PREFIX).
+EMAIL_DOMAIN = 'synthetic.ghumfir.test'
+PLACE_PREFIX = 'Synthetic '
+PASSWORD = 'synthetic-password'
+
+MEDIA_FOLDER = 'Memories/synthetic'
+PROFILE_PICTURE = 'Profile/synthetic.jpg'
+PLACEHOLDER_IMAGES = 6
+
+# Roughly the bounding box of Nepal
+LATITUDE_RANGE = (26.4, 30.4)
+LONGITUDE_RANGE = (80.1, 88.2)
+
+REGIONS = [
+    'Kaski', 'Mustang', 'Solukhumbu', 'Chitwan', 'Kathmandu', 'Lalitpur', 'Bhaktapur', 'Rasuwa',
+    'Manang', 'Dolpa', 'Gorkha', 'Ilam', 'Palpa', 'Lumbini', 'Sindhupalchok', 'Taplejung',
+]
+PLACE_WORDS = [
+    'Lake', 'Base Camp', 'Temple', 'Valley', 'Viewpoint', 'Trail', 'Village', 'Monastery',
+    'Durbar Square', 'National Park', 'Hill', 'Pass', 'Waterfall', 'Stupa', 'Gorge', 'Glacier',
+]
+SEASONS = ['Spring', 'Autumn', 'Winter', 'Monsoon', 'Spring and Autumn']
+ACTIVITIES = ['Trekking', 'Rafting', 'Paragliding', 'Jungle safari', 'Pilgrimage', 'Mountain biking']
+LANGUAGES = ['Nepali', 'English', 'Hindi', 'Newari', 'Tibetan', 'Sherpa', 'French', 'German', 'Chinese']
+FIRST_NAMES = ['Aarav', 'Sita', 'Ram', 'Gita', 'Pemba', 'Nima', 'Sujan', 'Anjali', 'Bikash', 'Kiran', 'Maya', 'Tenzing']
+LAST_NAMES = ['Sherpa', 'Gurung', 'Shrestha', 'Thapa', 'Tamang', 'Rai', 'Magar', 'Karki', 'Bhandari', 'Lama']
+UPDATES = [
+    'Trail is clear, no snow on the pass',
+    'Road blocked by a landslide near the bridge',
+    'Lodges are full this week, book ahead',
+    'Water levels are high after the rain',
+    'Permit office is closed on Saturdays',
+]
+
+
+def _ensure_placeholder_images(rng):
+    """A handful of small JPEGs that every synthetic media row points at."""
+    names = []
+    for index in range(PLACEHOLDER_IMAGES):
+        name = f"{MEDIA_FOLDER}/placeholder_{index}.jpg"
+        names.append(name)
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', (1600, 1200), color).save(path, 'JPEG', quality=80)
+
+    path = os.path.join(settings.MEDIA_ROOT, PROFILE_PICTURE)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 400), (90, 140, 200)).save(buffer, 'JPEG')
+        with open(path, 'wb') as f:
+            f.write(buffer.getvalue())
+    return names
+
+
+def _spread(rng, objects, days):
+    # auto_now_add stamps every bulk-created row with the same time
+    now = timezone.now()
+    for obj in objects:
+        obj.created_at = now - timedelta(seconds=rng.randrange(days * 24 * 3600))
+
+
+def _create_users(rng, count, batch_size):
+    User = get_user_model()
+    password = make_password(PASSWORD)  # hashing once keeps large runs fast
+    start = User.objects.filter(email__endswith='@' + EMAIL_DOMAIN).count()
+    users = [
+        User(
+            email=f"user{start + index}@{EMAIL_DOMAIN}",
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            password=password,
+            points=rng.randrange(0, 500),
+            profile_picture=PROFILE_PICTURE,
+        )
+        for index in range(count)
+    ]
+    User.objects.bulk_create(users, batch_size=batch_size)
+    return list(User.objects.filter(email__endswith='@' + EMAIL_DOMAIN).values_list('id', flat=True))
+
+
+def _create_places(rng, count, batch_size):
+    start = Place.objects.filter(name__startswith=PLACE_PREFIX).count()
+    places = []
+    for index in range(count):
+        region = rng.choice(REGIONS)
+        latitude = round(rng.uniform(*LATITUDE_RANGE), 6)
+        longitude = round(rng.uniform(*LONGITUDE_RANGE), 6)
+        place = Place(
+            name=f"{PLACE_PREFIX}{region} {rng.choice(PLACE_WORDS)} {start + index}",
+            region=region,
+            destination_type=rng.choice(Place.DESTINATION_TYPE_CHOICES)[0],
+            popularity=rng.choice(Place.POPULARITY_CHOICES)[0],
+            best_season=rng.choice(SEASONS),
+            duration_days=rng.randrange(1, 21),
+            altitude_m=rng.randrange(60, 5500),
+            latitude=latitude,
+            longitude=longitude,
+            geohash=geohash_encode(latitude, longitude),
+            starting_point=f"{rng.choice(REGIONS)} bus park",
+            route_overview=f"{rng.choice(ACTIVITIES)} through {region} along the {rng.choice(PLACE_WORDS).lower()}",
+            ending_point=rng.choice(REGIONS),
+            difficulty=rng.choice(Place.DIFFICULTY_CHOICES)[0],
+            permit_required=rng.random() < 0.3,
+            adventure_type=rng.choice(ACTIVITIES),
+            cultural_attractions=f"{rng.choice(PLACE_WORDS)} and local festivals",
+            wildlife_highlights=rng.choice(['Red panda', 'Rhino', 'Snow leopard', 'Birds', 'Tiger']),
+        )
+        place.content_hash = place.compute_content_hash()
+        places.append(place)
+    Place.objects.bulk_create(places, batch_size=batch_size)
+    places_bulk_changed(place.name for place in places)
+    return list(Place.objects.filter(name__startswith=PLACE_PREFIX).values_list('id', flat=True))
+
+
+def _create_guides(rng, user_ids, count, batch_size):
+    taken = set(GuideProfile.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    candidates = [user_id for user_id in user_ids if user_id not in taken]
+    chosen = rng.sample(candidates, min(count, len(candidates)))
+    guides = [
+        GuideProfile(
+            user_id=user_id,
+            primary_location=rng.choice(REGIONS),
+            secondary_location=rng.choice(REGIONS),
+            experience=rng.choice(GuideProfile.EXPERIENCE_YEARS)[0],
+            rating=round(rng.uniform(1, 5), 1),
+            description="Synthetic guide profile",
+            languages=', '.join(rng.sample(LANGUAGES, rng.randrange(1, 4))),
+            rate_per_hour=rng.randrange(500, 8000, 100),
+            Licenced=rng.random() < 0.5,
+            trip_completed=rng.randrange(0, 300),
+            is_verified=rng.random() < 0.3,
+        )
+        for user_id in chosen
+    ]
+    GuideProfile.objects.bulk_create(guides, batch_size=batch_size)
+
+    # bulk_create skips the save signal, so link the languages here
+    Language.objects.bulk_create([Language(name=name) for name in LANGUAGES], ignore_conflicts=True)
+    language_ids = dict(Language.objects.values_list('name', 'id'))
+    spoken = GuideProfile.objects.filter(user_id__in=chosen).values_list('id', 'languages')
+    Through = GuideProfile.spoken_languages.through
+    Through.objects.bulk_create([
+        Through(guideprofile_id=guide_id, language_id=language_ids[name])
+        for guide_id, languages in spoken for name in parse_languages(languages) if name in language_ids
+    ], batch_size=batch_size, ignore_conflicts=True)
+    suggestions.add_terms('guide', [location for guide in guides
+                                    for location in (guide.primary_location, guide.secondary_location)])
+    return len(guides)
+
+
+def _create_memories(rng, user_ids, count, media_per_memory, batch_size):
+    images = _ensure_placeholder_images(rng)
+    memories = [
+        Memory(user_id=rng.choice(user_ids), location_name=f"{rng.choice(REGIONS)} {rng.choice(PLACE_WORDS)}")
+        for _ in range(count)
+    ]
+    memories = Memory.objects.bulk_create(memories, batch_size=batch_size)
+    _spread(rng, memories, 365)
+    Memory.objects.bulk_update(memories, ['created_at'], batch_size=batch_size)
+
+    media = [
+        MemoryMedia(memory=memory, file=rng.choice(images), media_type='image')
+        for memory in memories
+        for _ in range(rng.randrange(1, media_per_memory + 1))
+    ]
+    MemoryMedia.objects.bulk_create(media, batch_size=batch_size)
+    suggestions.add_terms('memory', [memory.location_name for memory in memories])
+    return len(memories), len(media)
+
+
+def _create_place_updates(rng, user_ids, place_ids, count, batch_size):
+    updates = [
+        PlaceUpdate(user_id=rng.choice(user_ids), place_id=rng.choice(place_ids), update=rng.choice(UPDATES))
+        for _ in range(count)
+    ]
+    updates = PlaceUpdate.objects.bulk_create(updates, batch_size=batch_size)
+    _spread(rng, updates, 90)
+    PlaceUpdate.objects.bulk_update(updates, ['created_at'], batch_size=batch_size)
+    return len(updates)
+
+
+def seed_synthetic(users=200, places=2000, guides=50, memories=1000, media_per_memory=3,
+                   place_updates=2000, seed=None, batch_size=1000):
+    """
+    Add synthetic users, places, guides, memories (with media rows) and place
+    updates. Returns the number of rows created per kind.
+    """
+    rng = random.Random(seed)
+    created = {}
+    with transaction.atomic():
+        user_ids = _create_users(rng, users, batch_size)
+        created['users'] = users
+        place_ids = _create_places(rng, places, batch_size) if places else []
+        created['places'] = places
+        created['guides'] = _create_guides(rng, user_ids, guides, batch_size) if user_ids else 0
+        created['memories'], created['media'] = (
+            _create_memories(rng, user_ids, memories, media_per_memory, batch_size) if user_ids else (0, 0)
+        )
+        created['place_updates'] = (
+            _create_place_updates(rng, user_ids, place_ids, place_updates, batch_size)
+            if user_ids and place_ids else 0
+        )
+    page_cache.bump('place', 'guide')
+    invalidate_leaderboard()
+    return created
+
+
+def clear_synthetic():
+    """Delete everything seed_synthetic created. Returns the deleted row counts."""
+    User = get_user_model()
+    with transaction.atomic():
+        _, users = User.objects.filter(email__endswith='@' + EMAIL_DOMAIN).delete()
+        _, places = Place.objects.filter(name__startswith=PLACE_PREFIX).delete()
+    page_cache.bump('place', 'guide')
+    invalidate_leaderboard()
+    deleted = {}
+    for counts in (users, places):
+        for label, count in counts.items():
+            deleted[label] = deleted.get(label, 0) + count
+    return deleted
@@ -0,0 +1,29 @@
+from django import template
+
+from ..fragment_cache import render_cards, render_shared
+from ..page_cache import viewer_key
+
+register = template.Library()
+
+
+@register.simple_tag
+def cards(template_name, objects, name):
+    """{% cards 'main/cards/guide_card.html' guides 'guide' %}: one cached card per object."""
+    return render_cards(template_name, objects, name)
+
+
+@register.simple_tag(takes_context=True)
+def include_cached(context, template_name, *vary_on, per_viewer=False):
+    """
+    {% include_cached 'nav.html' top_header per_viewer=True %}: an include
+    that is rendered once per combination of the vary_on values (and, with
+    per_viewer, of the signed-in user's details) and reused after that.
+    """
+    if per_viewer:
+        vary_on += (viewer_key(context['request']),)
+    return render_shared(context.template.engine.get_template(template_name), context, vary_on)
+
+
+@register.filter
+def stars(rating):
+    return '★' * round(rating or 0)
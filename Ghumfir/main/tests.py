@@ -1,3 +1,121 @@
-from django.test import TestCase
+from datetime import timedelta
+from smtplib import SMTPException
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import outbox
+from .models import OutboxEmail
+
+
+class RecordingBackend(EmailBackend):
+    """locmem backend that records its connections and refuses some recipients."""
+    opened = []
+    refuse_open = False
+
+    def open(self):
+        if self.refuse_open:
+            raise SMTPException("connection refused")
+        type(self).opened.append(self)
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(to.endswith('@bounce.test') for to in message.to):
+                raise SMTPException(f"rejected {message.to[0]}")
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='main.tests.RecordingBackend')
+class ProcessOutboxTests(TestCase):
+    def setUp(self):
+        RecordingBackend.opened = []
+        RecordingBackend.refuse_open = False
+
+    def queue(self, to_email, **fields):
+        return OutboxEmail.objects.create(to_email=to_email, subject="SOS Alert", body="Help", **fields)
+
+    def test_claims_due_and_abandoned_rows_only(self):
+        now = timezone.now()
+        due = self.queue('due@example.test')
+        abandoned = self.queue('abandoned@example.test', status='sending',
+                               claimed_at=now - outbox.CLAIM_TIMEOUT - timedelta(minutes=1))
+        later = self.queue('later@example.test', next_attempt_at=now + timedelta(minutes=5))
+        claimed = self.queue('claimed@example.test', status='sending', claimed_at=now)
+        done = self.queue('done@example.test', status='sent', sent_at=now)
+
+        self.assertEqual(outbox.process_outbox(), (2, 0))
+
+        self.assertCountEqual([message.to[0] for message in mail.outbox],
+                              ['due@example.test', 'abandoned@example.test'])
+        for row in (due, abandoned):
+            row.refresh_from_db()
+            self.assertEqual(row.status, 'sent')
+            self.assertIsNone(row.claimed_at)
+        self.assertEqual(OutboxEmail.objects.get(pk=later.pk).status, 'pending')
+        self.assertEqual(OutboxEmail.objects.get(pk=claimed.pk).status, 'sending')
+        self.assertEqual(OutboxEmail.objects.get(pk=done.pk).status, 'sent')
+
+    def test_claimed_rows_are_not_claimed_again(self):
+        self.queue('once@example.test')
+        self.assertEqual(len(outbox._claim_due(10)), 1)
+        self.assertEqual(outbox._claim_due(10), [])
+        self.assertEqual(outbox.process_outbox(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_failed_send_backs_off_then_gives_up(self):
+        row = self.queue('someone@bounce.test')
+
+        with self.assertLogs('main.outbox', 'WARNING') as logs:
+            for attempt in range(1, outbox.MAX_ATTEMPTS):
+                started = timezone.now()
+                self.assertEqual(outbox.process_outbox(), (0, 1))
+                row.refresh_from_db()
+                self.assertEqual((row.status, row.attempts), ('pending', attempt))
+                self.assertIn('rejected', row.last_error)
+                self.assertGreaterEqual(row.next_attempt_at, started + outbox.backoff(attempt))
+                self.assertLessEqual(row.next_attempt_at, timezone.now() + outbox.backoff(attempt))
+                # Not due again until the backoff has passed
+                self.assertEqual(outbox.process_outbox(), (0, 0))
+                OutboxEmail.objects.filter(pk=row.pk).update(next_attempt_at=timezone.now())
+
+            self.assertEqual(outbox.process_outbox(), (0, 1))
+            row.refresh_from_db()
+            self.assertEqual((row.status, row.attempts), ('failed', outbox.MAX_ATTEMPTS))
+            self.assertEqual(outbox.process_outbox(), (0, 0))
+            self.assertEqual(mail.outbox, [])
+        self.assertIn('gave up after', logs.output[-1])
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual(outbox.backoff(1), outbox.BACKOFF_BASE)
+        self.assertEqual(outbox.backoff(2), outbox.BACKOFF_BASE * 2)
+        self.assertEqual(outbox.backoff(3), outbox.BACKOFF_BASE * 4)
+        self.assertEqual(outbox.backoff(20), outbox.BACKOFF_MAX)
+
+    def test_batch_is_sent_over_one_connection(self):
+        for index in range(5):
+            self.queue(f'contact{index}@example.test')
+        bounced = self.queue('someone@bounce.test')
+
+        with self.assertLogs('main.outbox', 'WARNING'):
+            self.assertEqual(outbox.process_outbox(), (5, 1))
+
+        self.assertEqual(len(RecordingBackend.opened), 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(OutboxEmail.objects.filter(status='sent').count(), 5)
+        self.assertEqual(OutboxEmail.objects.get(pk=bounced.pk).status, 'pending')
+
+    def test_connection_failure_requeues_the_whole_batch(self):
+        RecordingBackend.refuse_open = True
+        rows = [self.queue(f'contact{index}@example.test') for index in range(3)]
+
+        with self.assertLogs('main.outbox', 'WARNING'):
+            self.assertEqual(outbox.process_outbox(), (0, 3))
+
+        self.assertEqual(mail.outbox, [])
+        for row in rows:
+            row.refresh_from_db()
+            self.assertEqual((row.status, row.attempts), ('pending', 1))
+            self.assertIn('connection refused', row.last_error)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+from .models import MemoryMedia
+
+# (offset, leading bytes, media type, extension). The client's content type
+# and file name are not trusted; the first bytes of the file decide.
+SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'image', '.jpg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image', '.png'),
+    (0, b'GIF87a', 'image', '.gif'),
+    (0, b'GIF89a', 'image', '.gif'),
+    (8, b'WEBP', 'image', '.webp'),
+    (0, b'\x1a\x45\xdf\xa3', 'video', '.webm'),
+]
+# ISO base media files (MP4, MOV, HEIC) name their brand after "ftyp"
+IMAGE_BRANDS = {b'heic': '.heic', b'heix': '.heic', b'mif1': '.heif', b'avif': '.avif'}
+QUICKTIME_BRAND = b'qt  '
+
+
+def sniff(head):
+    """(media type, extension) from the first bytes of a file, or None if it is neither."""
+    for offset, signature, media_type, extension in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return media_type, extension
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand in IMAGE_BRANDS:
+            return 'image', IMAGE_BRANDS[brand]
+        return 'video', '.mov' if brand == QUICKTIME_BRAND else '.mp4'
+    return None
+
+
+class StoredUpload(UploadedFile):
+    """A file MemoryUploadHandler has already put into storage under stored_name."""
+
+    def __init__(self, stored_name, name, media_type, content_type, size):
+        super().__init__(file=None, name=name, content_type=content_type, size=size)
+        self.stored_name = stored_name
+        self.media_type = media_type
+
+    def close(self):
+        pass
+
+
+class MemoryUploadHandler(FileUploadHandler):
+    """
+    Streams each uploaded file straight into the media storage's incoming
+    folder while hashing it and sniffing its type from the first chunk, then
+    moves it into its content-addressed place. No file is held in memory or
+    copied a second time.
+
+    Going over MEMORY_UPLOAD_MAX_FILE_SIZE or MEMORY_UPLOAD_MAX_REQUEST_SIZE,
+    or sending something that is not a photo or video, stops the upload and
+    sets `error`. The view then calls discard(), or retain() once it saves
+    the rows.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.storage = default_storage
+        self.max_file_size = settings.MEMORY_UPLOAD_MAX_FILE_SIZE
+        self.max_request_size = settings.MEMORY_UPLOAD_MAX_REQUEST_SIZE
+        self.error = None
+        self.received = 0
+        self.stored = []
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_request_size:
+            self.error = f"Uploads are limited to {self.max_request_size // (1024 * 1024)} MB at a time."
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.error:
+            raise StopUpload()
+        fd, self.temp_path = self.storage.incoming_file()
+        self.file = os.fdopen(fd, 'wb')
+        self.digest = hashlib.sha256()
+        self.kind = None
+
+    def _fail(self, message):
+        self.error = message
+        self._remove_temp()
+        raise StopUpload()
+
+    def _remove_temp(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.kind is None:
+            self.kind = sniff(raw_data[:16])
+            if self.kind is None:
+                self._fail(f"{self.file_name} is not a photo or video.")
+        self.received += len(raw_data)
+        if start + len(raw_data) > self.max_file_size:
+            self._fail(f"{self.file_name} is larger than {self.max_file_size // (1024 * 1024)} MB.")
+        if self.received > self.max_request_size:
+            self._fail(f"Uploads are limited to {self.max_request_size // (1024 * 1024)} MB at a time.")
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.close()
+        if self.kind is None:  # empty file
+            self._remove_temp()
+            return None
+        media_type, extension = self.kind
+        name = MemoryMedia._meta.get_field('file').generate_filename(None, 'upload' + extension)
+        stored_name = self.storage.adopt(self.temp_path, name, self.digest.hexdigest(), file_size, retain=False)
+        self.stored.append((stored_name, file_size))
+        return StoredUpload(stored_name, self.file_name, media_type, self.content_type, file_size)
+
+    def upload_interrupted(self):
+        if hasattr(self, 'temp_path'):
+            self._remove_temp()
+
+    def retain(self):
+        """Reference the stored files; call in the transaction that saves their rows."""
+        self.storage.retain_all(self.stored)
+
+    def discard(self):
+        """Remove the stored files of an upload that will not be saved, unless something else uses them."""
+        for name, _ in self.stored:
+            self.storage.delete_if_unreferenced(name)
+        self.stored = []
@@ -1,5 +1,10 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# Under ASGI (Ghumfir/asgi.py) the read-heavy pages and the one-shot SOS
+# upload are served by their async versions
+pages = async_views if settings.SERVER_MODE == 'asgi' else views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -10,18 +15,35 @@ urlpatterns = [
 
     path('home/', views.dashboard, name='dashboard'),
 
-    path('memory-capsule/', views.memoryCapsule, name="memory_capsule"),
+    path('memory-capsule/', pages.memoryCapsule, name="memory_capsule"),
+    path('memory-capsule/feed/', views.memory_capsule_feed, name="memory_capsule_feed"),
 
     path('add-memory/', views.add_memory, name="add_memory"),
 
-    path('upload-sos-video/', views.upload_sos_video, name='upload_sos_video'),
+    path('upload-sos-video/', pages.upload_sos_video, name='upload_sos_video'),
+    path('sos-upload/start/', views.sos_upload_start, name='sos_upload_start'),
+    path('sos-upload/<uuid:token>/', views.sos_upload_chunk, name='sos_upload_chunk'),
+    path('sos-upload/<uuid:token>/finalize/', views.sos_upload_finalize, name='sos_upload_finalize'),
     path('user-profile/', views.updateProfile, name="user_profile"),
 
     path('become-guide/', views.become_guide, name="become_guide"),
-    path('guide-listing/', views.guideListing, name="guide_listing"),
+    path('guide-listing/', pages.guideListing, name="guide_listing"),
 
     path('guide-profile/<str:pk>/', views.guideProfile, name="guide_profile"),
-
-    path('place/<int:pk>/', views.place_detail, name='place_detail'),
-    path('place-listing/', views.places_listing, name="place_listing"),
+    path('guide-profile/<int:pk>/review/', views.guide_review, name="guide_review"),
+
+    path('place/<int:pk>/', pages.place_detail, name='place_detail'),
+    path('place-listing/', pages.places_listing, name="place_listing"),
+    path('place-listing/results/', views.place_search_results, name="place_search_results"),
+    path('place-map/', views.place_map_markers, name="place_map_markers"),
+    path('places-nearby/', views.places_nearby, name="places_nearby"),
+
+    path('leaderboard/', views.points_leaderboard, name="leaderboard"),
+    path('metrics', views.metrics_view, name="metrics"),
+
+    path('api/places/', api.place_list, name="api_place_list"),
+    path('api/places/<int:pk>/', api.place_item, name="api_place_item"),
+    path('api/guides/', api.guide_list, name="api_guide_list"),
+    path('api/guides/<int:pk>/', api.guide_item, name="api_guide_item"),
+    path('api/memories/', api.memory_list, name="api_memory_list"),
 ]
\ No newline at end of file
@@ -1,16 +1,35 @@
+import hmac
+
 from django.shortcuts import render, redirect
 from .models import *
+from django.conf import settings
 from django.contrib.auth import login, authenticate, logout, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.mail import EmailMessage
-from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
-import os
-from datetime import datetime
-from django.db.models import Q
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404
-from fuzzywuzzy import process
+from .content_storage import release
+from .db_router import read_only_view
+from .geo import cluster_places, parse_bbox
+from .guides import parse_guide_filters, search_guides
+from . import metrics
+from .media import schedule_variants
+from .memories import CAPSULE_PAGE_SIZE, capsule_queryset, memory_page, serialize_memory
+from .nearby import NEARBY_LIMIT, NEARBY_RADIUS_KM, nearby_places
+from .page_cache import cached_page
+from .points import LEADERBOARD_SIZE, MEMORY_POINTS, award_points, leaderboard, user_rank
+from .reviews import RECENT_REVIEWS, submit_review
+from .pagination import get_page_size
+from .search import SEARCH_PAGE_SIZE, search_places_page
+from .similar import similar_places
+from .sos import (
+    MAX_CHUNK_SIZE as SOS_MAX_CHUNK_SIZE, ChunkOutOfOrder, alert_contacts, append_chunk, finalize_upload, save_video,
+    start_upload, upload_state,
+)
+from .suggestions import suggest
+from .uploads import MemoryUploadHandler
 
 User = get_user_model()
 
@@ -93,41 +112,33 @@ def dashboard(request):
     if request.method == "GET":
         q = request.GET.get('q', '')
 
-    guides = GuideProfile.objects.order_by('-rating')[:4]
-    for guide in guides:
-        guide.stars = range(round(guide.rating))
+    # Matches guide_rating_idx, so this reads the first four index entries
+    guides = GuideProfile.objects.select_related('user').order_by('-rating', 'id')[:4]
 
     context = {"guides": guides, 'display_footer': True, "top_header": True}
 
     return render(request, "main/dashboard.html", context)
 
+@read_only_view
 def memoryCapsule(request):
     q = request.GET.get('q', '').strip()
 
-    # 🔍 Filter memories based on query
-    memories = Memory.objects.filter(
-        Q(location_name__icontains=q)
-    ).prefetch_related('media')
-
-    # 🖼 Prepare memory data with at least one image
-    memory_data = [
-        {'memory': memory, 'images': memory.media.all()}
-        for memory in memories if memory.media.exists()
-    ]
+    # 🔍 First page of memories that have media; the rest is loaded by infinite scroll
+    memories, next_cursor = memory_page(q)
+    memory_data = [serialize_memory(memory) for memory in memories]
 
     memory_count = len(memory_data)
+    if next_cursor:
+        memory_count = capsule_queryset(q).count()
     suggestion = None
 
     # 💡 Provide fuzzy search suggestion if no match found
     if q and memory_count == 0:
-        all_names = list(Memory.objects.values_list('location_name', flat=True))
-        if all_names:
-            suggestion_result = process.extractOne(q, all_names, score_cutoff=70)
-            if suggestion_result:
-                suggestion = suggestion_result[0]
+        suggestion = suggest('memory', q)
 
     context = {
         "memory_data": memory_data,
+        "next_cursor": next_cursor,
         "search_query": q,
         "memory_count": memory_count,
         "suggestion": suggestion,
@@ -135,25 +146,54 @@ def memoryCapsule(request):
     }
     return render(request, "main/memory_capsule.html", context)
 
+@read_only_view
+def memory_capsule_feed(request):
+    q = request.GET.get('q', '').strip()
+    page_size = get_page_size(request, CAPSULE_PAGE_SIZE, 60)
+    memories, next_cursor = memory_page(q, request.GET.get('cursor'), page_size)
+
+    return JsonResponse({
+        'results': [serialize_memory(memory) for memory in memories],
+        'next_cursor': next_cursor,
+    })
+
 @login_required(login_url='login')
+@csrf_exempt
 def add_memory(request):
+    # The files are streamed into storage while the body is parsed, so the
+    # handler has to be in place before the CSRF check reads request.POST.
+    handler = MemoryUploadHandler(request)
+    request.upload_handlers = [handler]
+    return _add_memory(request, handler)
+
+@csrf_protect
+def _add_memory(request, handler):
     user = request.user
 
     if request.method == 'POST':
         location_name = request.POST.get('location_name')
-        files = request.FILES.getlist('files')
-
-        memory = Memory.objects.create(
-            user=request.user,
-            location_name=location_name
-        )
-
-        for file in files:
-            media_type = 'video' if file.content_type.startswith('video') else 'image'
-            MemoryMedia.objects.create(memory=memory, file=file, media_type=media_type)
-
-        user.points += 5
-        user.save()
+        uploads = request.FILES.getlist('files')
+        if handler.error:
+            handler.discard()
+            messages.error(request, handler.error)
+            return redirect('add_memory')
+
+        # One transaction for the memory, all of its media and the points
+        with transaction.atomic():
+            handler.retain()
+            memory = Memory.objects.create(
+                user=request.user,
+                location_name=location_name
+            )
+            media = MemoryMedia.objects.bulk_create([
+                MemoryMedia(memory=memory, file=upload.stored_name, media_type=upload.media_type)
+                for upload in uploads
+            ])
+
+            # Thumbnails are resized in the background once the rows are committed
+            schedule_variants(item.id for item in media if item.media_type == 'image')
+
+            award_points(user, MEMORY_POINTS, 'memory')
         return redirect('dashboard')
 
     return render(request, 'main/add_memory.html')
@@ -163,41 +203,59 @@ def add_memory(request):
 def upload_sos_video(request):
     if request.method == "POST" and request.FILES.get("video"):
         user = request.user if request.user.is_authenticated else None
-        video_file = request.FILES["video"]
-
-        folder = os.path.join(settings.MEDIA_ROOT, "sos_videos")
-        os.makedirs(folder, exist_ok=True)
-
-        filename = f"sos_{user.id if user else 'unknown'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.webm"
-        filepath = os.path.join(folder, filename)
-
-        with open(filepath, "wb+") as dest:
-            for chunk in video_file.chunks():
-                dest.write(chunk)
+        filepath = save_video(user, request.FILES["video"])
 
         if user:
-            contacts = EmergencyEmail.objects.filter(user=user)
-            if contacts.exists():
-                for contact in contacts:
-                    send_sos_email(contact.emergency_email, filepath, user)
-            else:
-                print("⚠️ No emergency email found for this user.")
+            alert_contacts(user, filepath)
         else:
             print("⚠️ Anonymous upload — cannot find emergency email.")
 
-        return JsonResponse({"status": "success", "message": "SOS video saved & sent."})
+        return JsonResponse({"status": "success", "message": "SOS video saved, alerts are being sent."})
     return JsonResponse({"status": "error", "message": "Invalid request."}, status=400)
 
-def send_sos_email(to_email, filepath, user):
+@login_required(login_url='login')
+@csrf_exempt
+def sos_upload_start(request):
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Invalid request."}, status=400)
+
+    upload = start_upload(request.user)
+    return JsonResponse({"status": "success", **upload_state(upload)}, status=201)
+
+@login_required(login_url='login')
+@csrf_exempt
+def sos_upload_chunk(request, token):
+    upload = get_object_or_404(SOSUpload, token=token, user=request.user)
+    if request.method == "GET":
+        return JsonResponse({"status": "success", **upload_state(upload)})
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Invalid request."}, status=400)
+
+    try:
+        sequence = int(request.GET["seq"])
+        offset = int(request.GET["offset"])
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except (KeyError, ValueError):
+        return JsonResponse({"status": "error", "message": "seq and offset are required."}, status=400)
+    if length <= 0 or length > SOS_MAX_CHUNK_SIZE:
+        return JsonResponse({"status": "error", "message": "Invalid chunk size."}, status=413)
+
     try:
-        subject = f"SOS Alert from {user.email if user else 'Unknown User'}"
-        body = "An SOS alert has been triggered. The recorded video/audio is attached."
-        email = EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [to_email])
-        email.attach_file(filepath)
-        email.send()
-        print(f"✅ SOS email sent to {to_email}")
-    except Exception as e:
-        print("❌ Email sending failed:", e)
+        upload = append_chunk(upload, sequence, offset, request, length)
+    except ChunkOutOfOrder as e:
+        # Tell the client where we are so it can resend from there
+        return JsonResponse({"status": "error", "message": "Out of order chunk.", **upload_state(e.upload)}, status=409)
+    return JsonResponse({"status": "success", **upload_state(upload)})
+
+@login_required(login_url='login')
+@csrf_exempt
+def sos_upload_finalize(request, token):
+    upload = get_object_or_404(SOSUpload, token=token, user=request.user)
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Invalid request."}, status=400)
+
+    upload = finalize_upload(upload)
+    return JsonResponse({"status": "success", "message": "SOS video saved, alerts are being sent.", **upload_state(upload)})
 
 @login_required(login_url='login')
 def updateProfile(request):
@@ -213,10 +271,13 @@ def updateProfile(request):
         user.last_name = last_name
         user.mobile_no = mobile_no
 
+        previous_picture = user.profile_picture
         if profile_picture:
             user.profile_picture = profile_picture
 
         user.save()
+        if profile_picture:
+            release(previous_picture)
         messages.success(request, "Profile updated successfully!")
         return redirect('dashboard')
 
@@ -251,10 +312,13 @@ def become_guide(request):
         user.last_name = last_name
         user.mobile_no = mobile_no
 
+        previous_picture = user.profile_picture
         if profile_picture:
             user.profile_picture = profile_picture
 
         user.save()
+        if profile_picture:
+            release(previous_picture)
 
         guide = GuideProfile.objects.create(
             user=user,
@@ -273,68 +337,148 @@ def become_guide(request):
     EXPERIENCE_YEARS = GuideProfile.EXPERIENCE_YEARS
     return render(request, 'main/become_guide.html', {'experience_choices': EXPERIENCE_YEARS})
 
+@read_only_view
+@cached_page('guide')
 def guideListing(request):
-    q = request.GET.get('q', '')
-
-    guides = GuideProfile.objects.filter(
-        Q(primary_location__icontains=q) |
-        Q(secondary_location__icontains=q) |
-        Q(user__first_name__icontains=q) |
-        Q(languages__icontains=q) |
-        Q(user__last_name__icontains=q)
-    )
+    filters = parse_guide_filters(request.GET)
+    guides, next_cursor, guide_count, facets = search_guides(filters, request.GET.get('cursor'))
 
-    for guide in guides:
-        guide.stars = range(round(guide.rating))
+    suggestion = None
+    if filters['q'] and guide_count == 0:
+        suggestion = suggest('guide', filters['q'])
 
-    guide_count = guides.count()
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
 
-    context = {"guides": guides, 'display_footer': True, 'guide_count': guide_count, "search_query": q, "top_header": True}
+    context = {"guides": guides, 'display_footer': True, 'guide_count': guide_count, "search_query": filters['q'],
+               "suggestion": suggestion, "facets": facets, "next_query": next_query, "top_header": True}
     return render(request, "main/guide_listing.html", context)
 
+@read_only_view
+@cached_page('guide')
 def guideProfile(request, pk):
     guide = GuideProfile.objects.get(id=pk)
-    context = {'guide': guide}
+    reviews = guide.reviews.select_related('user').order_by('-created_at')[:RECENT_REVIEWS]
+    context = {'guide': guide, 'reviews': reviews}
     return render(request, 'main/guide_profile.html', context)
 
+@login_required(login_url='login')
+def guide_review(request, pk):
+    guide = get_object_or_404(GuideProfile, pk=pk)
+    if guide.user_id == request.user.id:
+        messages.error(request, "You can't review yourself.")
+        return redirect('guide_profile', pk=guide.pk)
+
+    review = GuideReview.objects.filter(guide=guide, user=request.user).first()
+
+    if request.method == 'POST':
+        try:
+            rating = int(request.POST.get('rating', ''))
+        except ValueError:
+            rating = 0
+        if not 1 <= rating <= 5:
+            messages.error(request, "Please pick a rating from 1 to 5.")
+        else:
+            submit_review(guide, request.user, rating, request.POST.get('comment', '').strip())
+            messages.success(request, "Thanks for your review!")
+            return redirect('guide_profile', pk=guide.pk)
+
+    return render(request, 'main/guide_review.html', {'guide': guide, 'review': review})
+
+@read_only_view
+@cached_page('place')
 def place_detail(request, pk):
     place = get_object_or_404(Place, pk=pk)
-    return render(request, 'main/place_detail.html', {'place': place})
 
+    nearby = []
+    if place.latitude is not None and place.longitude is not None:
+        nearby = nearby_places(place.latitude, place.longitude, radius_km=NEARBY_RADIUS_KM,
+                               k=NEARBY_LIMIT, exclude=place.pk)
+
+    context = {'place': place, 'nearby_places': nearby, 'similar_places': list(similar_places(place.pk))}
+    return render(request, 'main/place_detail.html', context)
+
+def _place_keywords(request):
+    return [request.GET.get(key, '').strip() for key in ('q1', 'q2', 'q3')]
+
+@read_only_view
+@cached_page('place')
 def places_listing(request):
-    q1 = request.GET.get('q1', '').strip()
-    q2 = request.GET.get('q2', '').strip()
-    q3 = request.GET.get('q3', '').strip()
-
-    # List of searchable text fields
-    search_fields = [
-        'name', 'region', 'destination_type', 'best_season', 'starting_point',
-        'route_overview', 'ending_point', 'transportation_access', 'lodges_hotels',
-        'food_availability', 'adventure_type', 'cultural_attractions', 'language_customs',
-        'local_community', 'not_to_miss_spots', 'photography_hotspots', 'unique_traditions',
-        'wildlife_highlights'
-    ]
+    # Only the first page of ranked results is rendered; the sidebar pulls
+    # the following pages from place_search_results as the user scrolls.
+    keywords = _place_keywords(request)
+    places, next_cursor = search_places_page(keywords)
 
-    # Build Q object for a single keyword (matches any field)
-    def q_for_keyword(keyword):
-        q_obj = Q()
-        for field in search_fields:
-            q_obj |= Q(**{f"{field}__icontains": keyword})
-        return q_obj
-
-    # Combine all keywords using OR
-    combined_query = Q()
-    for keyword in [q1, q2, q3]:
-        if keyword:
-            combined_query |= q_for_keyword(keyword)
-
-    # Filter places
-    places = Place.objects.filter(combined_query).distinct()
-
-    # Convert to list of dictionaries for template
-    places_list = list(
-        places.values('id', 'name', 'region', 'latitude', 'longitude')
+    suggestion = None
+    query = ' '.join(k for k in keywords if k)
+    if query and not places:
+        suggestion = suggest('place', query)
+
+    context = {'places': places, 'next_cursor': next_cursor, "suggestion": suggestion, "top_header": True}
+    return render(request, 'main/place_listing.html', context)
+
+@read_only_view
+def place_search_results(request):
+    page_size = get_page_size(request, SEARCH_PAGE_SIZE, 50)
+    places, next_cursor = search_places_page(
+        _place_keywords(request), request.GET.get('cursor'), page_size
     )
+    return JsonResponse({'results': places, 'next_cursor': next_cursor})
+
+@read_only_view
+def place_map_markers(request):
+    bbox = parse_bbox(request.GET.get('bbox'))
+    try:
+        zoom = int(request.GET.get('zoom', ''))
+    except ValueError:
+        zoom = None
+    if bbox is None or zoom is None:
+        return JsonResponse({"status": "error", "message": "bbox and zoom are required."}, status=400)
+
+    return JsonResponse(cluster_places(Place.objects.all(), bbox, zoom))
+
+@read_only_view
+def places_nearby(request):
+    try:
+        lat = float(request.GET['lat'])
+        lng = float(request.GET['lng'])
+        radius_km = float(request.GET['radius_km']) if request.GET.get('radius_km') else None
+        k = int(request.GET['k']) if request.GET.get('k') else None
+    except (KeyError, ValueError):
+        return JsonResponse({"status": "error", "message": "lat and lng are required."}, status=400)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return JsonResponse({"status": "error", "message": "lat or lng is out of range."}, status=400)
+    if (radius_km is not None and not radius_km > 0) or (k is not None and k < 1):
+        return JsonResponse({"status": "error", "message": "radius_km and k must be positive."}, status=400)
+    if radius_km is None and k is None:
+        k = NEARBY_LIMIT
+
+    places = nearby_places(lat, lng, radius_km=radius_km, k=k)
+    results = [
+        {'id': place.id, 'name': place.name, 'region': place.region, 'latitude': place.latitude,
+         'longitude': place.longitude, 'distance_km': place.distance_km}
+        for place in places
+    ]
+    return JsonResponse({'results': results})
 
-    context = {'places': places_list, "top_header": True}
-    return render(request, 'main/place_listing.html', context)
\ No newline at end of file
+@read_only_view
+def points_leaderboard(request):
+    limit = get_page_size(request, 10, LEADERBOARD_SIZE)
+    data = {'results': leaderboard(limit)}
+    if request.user.is_authenticated:
+        data['you'] = {'rank': user_rank(request.user), 'points': request.user.points}
+    return JsonResponse(data)
+
+def metrics_view(request):
+    # Staff in the browser, or a scraper presenting METRICS_TOKEN
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorized = request.user.is_authenticated and request.user.is_staff
+    presented = request.headers.get('Authorization', '').encode()
+    if token and hmac.compare_digest(presented, f"Bearer {token}".encode()):
+        authorized = True
+    if not authorized:
+        return HttpResponseForbidden("Staff only")
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')